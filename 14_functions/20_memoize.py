@@ -0,0 +1,151 @@
+"""
+Memoization for pure functions
+
+A pure function (15_pure_function.py) always gives the same output for the same
+input and has no side effects. That means we can remember its answers: the
+second time somebody asks, we return the stored result instead of computing.
+
+memoize adds:
+- a bounded LRU store (maxsize), so the memory does not grow forever
+- an optional ttl in seconds, for answers that should be refreshed now and then
+- argument normalization: f(2, samosa=3), f(chai=2, samosa=3) and
+  f(samosa=3, chai=2) are the same call, so they share one cache entry
+- cache_info() with hits, misses and hit ratio, and cache_clear()
+
+Only memoize pure functions: an impure one would skip its side effects on a hit.
+"""
+
+import inspect
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from time import monotonic, perf_counter
+
+CacheInfo = namedtuple("CacheInfo", "hits misses maxsize currsize hit_ratio")
+_KWARGS = object()  # separates positional from keyword parts of a key
+
+
+def memoize(func=None, *, maxsize=1024, ttl=None):
+    def decorate(func):
+        signature = inspect.signature(func)
+        params = signature.parameters.values()
+        # Simple signatures (no *args, **kwargs or keyword-only parameters) are
+        # normalized by hand; signature.bind() is correct but far too slow to
+        # run on every call.
+        plain = all(p.kind is p.POSITIONAL_OR_KEYWORD for p in params)
+        names = tuple(signature.parameters)
+        arity = len(names)
+        defaults = {p.name: p.default for p in params if p.default is not p.empty}
+        # for i positional arguments: the names still to fill, and their defaults
+        rest = [names[i:] for i in range(arity + 1)]
+        rest_defaults = [{n: defaults[n] for n in names[i:] if n in defaults}
+                         for i in range(arity + 1)]
+        store = OrderedDict()  # key -> (result, expires_at)
+        stats = {"hits": 0, "misses": 0}
+
+        def make_key(args, kwargs):
+            n = len(args)
+            if plain and not kwargs and n == arity:
+                return args
+            if plain and n <= arity:
+                merged = {**rest_defaults[n], **kwargs}
+                if len(merged) == len(rest[n]):  # no unknown keyword sneaked in
+                    try:
+                        return args + tuple(map(merged.__getitem__, rest[n]))
+                    except KeyError:
+                        pass  # a required argument is missing; let bind() complain
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            # without the marker f(("k", 1)) and f(k=1) would share a key
+            return bound.args + (_KWARGS,) + tuple(sorted(bound.kwargs.items()))
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            entry = store.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > monotonic()):
+                store.move_to_end(key)
+                stats["hits"] += 1
+                return entry[0]
+            stats["misses"] += 1
+            result = func(*args, **kwargs)
+            store[key] = (result, monotonic() + ttl if ttl is not None else None)
+            store.move_to_end(key)
+            if len(store) > maxsize:
+                store.popitem(last=False)
+            return result
+
+        def cache_info():
+            calls = stats["hits"] + stats["misses"]
+            ratio = stats["hits"] / calls if calls else 0.0
+            return CacheInfo(stats["hits"], stats["misses"], maxsize, len(store), ratio)
+
+        def cache_clear():
+            store.clear()
+            stats["hits"] = stats["misses"] = 0
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+# The pure functions from 15_pure_function.py, 18_built_in.py and 5_trace.py
+def pure_chai(cups):
+    return cups * 10
+
+
+def generate_bill(chai=0, samosa=0):
+    """
+    Calculate the total bill for chai and samosa.
+
+    :param chai: Number of chai cups (10 rupees each)
+    :param samosa: Number of samosa (15 rupees each)
+    :return: Total bill
+    """
+    return (chai * 10) + (samosa * 15)
+
+
+def add_vat(price, vat_rate):
+    return price * (100 + vat_rate) / 100
+
+
+cached_bill = memoize(generate_bill)
+print(cached_bill(2, 3), cached_bill(2, samosa=3), cached_bill(samosa=3, chai=2))
+print(cached_bill(2), cached_bill(chai=2), cached_bill(2, 0))
+print(cached_bill.cache_info())
+print(cached_bill.__doc__.strip().splitlines()[0])
+
+
+# Benchmark: a repetitive order stream (a shop sells the same few orders all day)
+ORDERS = 100_000
+stream = [(n % 5 + 1, n % 3) for n in range(ORDERS)]
+
+
+def run(label, chai_fn, bill_fn, vat_fn):
+    start = perf_counter()
+    for cups, samosa in stream:
+        chai_fn(cups)
+        bill_fn(chai=cups, samosa=samosa)
+        vat_fn(bill_fn(cups, samosa), 10)
+    elapsed = perf_counter() - start
+    print(f"{label:<9} {ORDERS / elapsed:>12,.0f} orders/s")
+
+
+run("plain", pure_chai, generate_bill, add_vat)
+memo_chai, memo_bill, memo_vat = memoize(pure_chai), memoize(generate_bill), memoize(add_vat)
+run("memoized", memo_chai, memo_bill, memo_vat)
+for fn in (memo_chai, memo_bill, memo_vat):
+    print(f"{fn.__name__:<14} {fn.cache_info()}")
+
+# These three are one multiplication each, cheaper than building a key and a
+# dict lookup, so memoizing them does not pay off. The same decorator on a pure
+# function that does real work (here: an expensive price quote) is a big win.
+
+
+def quote(cups, samosa=0):
+    return round(sum(add_vat(generate_bill(cups, samosa), rate / 10) for rate in range(20)), 2)
+
+
+run("quote", quote, generate_bill, add_vat)
+run("memoized", memoize(quote), generate_bill, add_vat)
@@ -0,0 +1,255 @@
+"""
+Generator-managed resource pool
+
+4_yieldfrom_and_close_generator.py closes chai_stall with close() and mentions
+the database case: a function yields a connection and closes it when done.
+Opening a connection per order is slow, so here connections are kept in a pool
+and reused:
+
+- pool.connection()  -> `with pool.connection() as db:` borrows a connection
+                        and gives it back when the block ends, however it ends
+- pool.lease()       -> a generator: next() borrows, close() (GeneratorExit)
+                        gives it back, just like closing chai_stall
+- max_size caps how many connections exist; when all are in use callers wait
+  (up to `timeout` seconds, then TimeoutError)
+- a connection that sat idle for more than `validate_after` seconds is checked
+  with validate() before it is handed out; a dead one (validate() returns False
+  or raises) is closed and replaced
+- stats(): checkouts, connections created/discarded, waits and wait time
+"""
+
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from time import monotonic, perf_counter, sleep
+from typing import Callable, Generic, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    created: int = 0
+    discarded: int = 0
+    waits: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+
+class ResourcePool(Generic[T]):
+    def __init__(self, create: Callable[[], T], *, max_size: int = 4,
+                 validate: Optional[Callable[[T], bool]] = None,
+                 close: Optional[Callable[[T], None]] = None,
+                 validate_after: float = 30.0, timeout: Optional[float] = None) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._create = create
+        self._validate = validate
+        self._close = close
+        self.max_size = max_size
+        self.validate_after = validate_after
+        self.timeout = timeout
+        self._idle = deque()  # (handle, idle since)
+        self._size = 0  # handles that exist, idle or checked out
+        self._available = threading.Condition()
+        self._stats = PoolStats()
+        self._closed = False
+
+    def _acquire(self) -> T:
+        stats = self._stats
+        with self._available:
+            if not self._idle and self._size >= self.max_size:
+                stats.waits += 1
+                start = perf_counter()
+                ok = self._available.wait_for(lambda: self._idle or self._size < self.max_size or self._closed,
+                                              self.timeout)
+                waited = perf_counter() - start
+                stats.wait_seconds += waited
+                stats.max_wait_seconds = max(stats.max_wait_seconds, waited)
+                if not ok:
+                    raise TimeoutError(f"no connection free after {self.timeout}s")
+            if self._closed:
+                raise RuntimeError("pool is closed")
+            stats.checkouts += 1
+            if self._idle:
+                handle, idle_since = self._idle.pop()  # most recently used: least likely to be stale
+            else:
+                handle, idle_since = None, None
+            self._size += handle is None  # reserve the slot before creating outside the lock
+
+        try:
+            if handle is not None:
+                if self._is_alive(handle, idle_since):
+                    return handle
+                # dead: close it and create a new one in the same slot
+                with self._available:
+                    stats.discarded += 1
+                if self._close is not None:
+                    try:
+                        self._close(handle)
+                    except Exception:
+                        pass  # it was dead already; the slot is what matters
+            handle = self._create()
+        except BaseException:
+            # give the slot back, or the pool shrinks for good
+            with self._available:
+                self._size -= 1
+                self._available.notify()
+            raise
+        stats.created += 1
+        return handle
+
+    def _is_alive(self, handle: T, idle_since: float) -> bool:
+        if self._validate is None or monotonic() - idle_since < self.validate_after:
+            return True
+        try:
+            return self._validate(handle)
+        except Exception:  # pinging a dead socket usually raises
+            return False
+
+    def _release(self, handle: T) -> None:
+        with self._available:
+            if not self._closed:
+                self._idle.append((handle, monotonic()))
+                self._available.notify()
+                return
+        self._discard(handle)
+
+    def _discard(self, handle: T) -> None:
+        with self._available:
+            self._size -= 1
+            self._stats.discarded += 1
+            self._available.notify()
+        if self._close is not None:
+            self._close(handle)
+
+    @contextmanager
+    def connection(self) -> Iterator[T]:
+        handle = self._acquire()
+        try:
+            yield handle
+        finally:
+            self._release(handle)
+
+    def lease(self) -> Iterator[T]:
+        """next() borrows a connection (and keeps giving the same one); close() returns it."""
+        handle = self._acquire()
+        try:
+            while True:
+                yield handle
+        finally:
+            self._release(handle)
+
+    def stats(self) -> PoolStats:
+        return PoolStats(**vars(self._stats))
+
+    def close(self) -> None:
+        """Close idle connections; checked-out ones are closed when they come back."""
+        with self._available:
+            self._closed = True
+            idle = [handle for handle, _ in self._idle]
+            self._idle.clear()
+            self._available.notify_all()
+        for handle in idle:
+            self._discard(handle)
+
+
+# A pretend database connection: connecting is the slow part
+CONNECT_SECONDS = 0.005
+
+
+class Connection:
+    opened = 0
+
+    def __init__(self) -> None:
+        sleep(CONNECT_SECONDS)
+        Connection.opened += 1
+        self.number = Connection.opened
+        self.alive = True
+
+    def execute(self, order: str) -> str:
+        return f"connection {self.number} saved {order}"
+
+    def ping(self) -> bool:
+        return self.alive
+
+    def close(self) -> None:
+        self.alive = False
+
+
+pool = ResourcePool(Connection, max_size=2, validate=Connection.ping, close=Connection.close,
+                    validate_after=0.0)
+
+
+def chai_stall():
+    # The stall holds one connection for as long as it is open
+    with pool.connection() as db:
+        try:
+            while True:
+                order = yield "Waiting for chai order..."
+                print(db.execute(order))
+        except GeneratorExit:
+            print("Stall closed, No more chai!")
+            raise
+
+
+stall = chai_stall()
+print(next(stall))
+stall.send("Masala chai")
+stall.close()  # GeneratorExit -> the with block ends -> the connection goes back
+
+lease = pool.lease()
+db = next(lease)
+print(db.execute("Ginger chai"), "(reused)")
+db.alive = False  # the server dropped it while it sat in the pool
+lease.close()
+with pool.connection() as db:
+    print(db.execute("Lemon chai"), "(the dead one was replaced)")
+print(pool.stats())
+pool.close()
+
+
+# Benchmark: 8 threads, 200 orders each; a new connection per order vs a pool of 4
+THREADS = 8
+ORDERS = 200
+
+
+def run(label: str, save_order: Callable[[str], str]) -> None:
+    def worker() -> None:
+        for n in range(ORDERS):
+            save_order(f"order {n}")
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    start = perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"{label:<24} {THREADS * ORDERS / (perf_counter() - start):>9,.0f} orders/s")
+
+
+def connect_per_order(order: str) -> str:
+    db = Connection()
+    try:
+        return db.execute(order)
+    finally:
+        db.close()
+
+
+pool = ResourcePool(Connection, max_size=4, validate=Connection.ping, close=Connection.close)
+
+
+def pooled(order: str) -> str:
+    with pool.connection() as db:
+        return db.execute(order)
+
+
+run("connection per order", connect_per_order)
+run("pool (max_size=4)", pooled)
+stats = pool.stats()
+print(f"checkouts {stats.checkouts:,}, created {stats.created}, waits {stats.waits:,}, "
+      f"mean wait {stats.wait_seconds / max(stats.waits, 1) * 1e6:.0f} µs, "
+      f"max wait {stats.max_wait_seconds * 1e3:.1f} ms")
+pool.close()
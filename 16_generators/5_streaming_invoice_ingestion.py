@@ -0,0 +1,197 @@
+"""
+Streaming invoice ingestion
+
+Everything we learned about generators (one value at a time, lazy evaluation,
+saving memory) applied to a real feed: a CSV or NDJSON file with invoice lines.
+The file can be bigger than the memory we have, because we never load it as a
+whole. Each stage is a generator that pulls from the stage before it:
+
+read_rows()  -> one raw row (dict) at a time
+parse_rows() -> one InvoiceItem at a time, bad rows go to a side channel
+ingest()     -> lists of chunk_size items, with throughput for every chunk
+
+A malformed row never stops the stream, it is handed to `on_reject` and the
+next row is read. That includes rows the csv module itself cannot read (a field
+over the field size limit, ...) and bytes that are not UTF-8.
+"""
+
+import csv
+import json
+import math
+import os
+import tempfile
+from dataclasses import dataclass
+from itertools import islice
+from time import perf_counter
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+
+@dataclass
+class InvoiceItem:
+    description: str
+    unit_price: float
+    quantity: int
+    discount_percent: float = 0.0  # 0-100
+
+    def total(self) -> float:
+        subtotal = self.unit_price * self.quantity
+        discount = subtotal * (self.discount_percent / 100.0)
+        return round(subtotal - discount, 2)
+
+
+@dataclass
+class RejectedRow:
+    line: int
+    raw: Any
+    reason: str
+
+
+@dataclass
+class UnreadableRow:
+    reason: str  # why the reader could not turn the line(s) into a row
+
+
+@dataclass
+class Chunk:
+    number: int
+    items: Any  # list of InvoiceItem, or whatever make_chunk builds from it
+    rows: int
+    rejected: int
+    rows_per_sec: float
+
+
+def read_rows(path: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield (line number, row) pairs; an NDJSON line that is not JSON is yielded as
+    text, a CSV row the reader fails on as an UnreadableRow.
+    """
+    # surrogateescape: bytes that are not UTF-8 come through as lone surrogates
+    # (to_item rejects them) instead of a UnicodeDecodeError ending the stream
+    with open(path, newline="", encoding="utf-8", errors="surrogateescape") as f:
+        if path.endswith(".csv"):
+            reader = csv.DictReader(f)
+            while True:
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    return
+                except csv.Error as e:
+                    # the reader skips the bad line and carries on after it, but
+                    # line_num does not count that line yet
+                    yield reader.line_num + 1, UnreadableRow(str(e))
+                    continue
+                yield reader.line_num, row
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError:
+                yield line_no, line
+
+
+def to_item(row: Any) -> InvoiceItem:
+    if isinstance(row, UnreadableRow):
+        raise ValueError(row.reason)
+    if not isinstance(row, dict):
+        raise ValueError("not a JSON object")
+    if None in row:
+        raise ValueError("too many columns")  # csv puts extra columns under None
+    quantity = int(row["quantity"])
+    unit_price = float(row["unit_price"])
+    discount = float(row.get("discount_percent") or 0.0)
+    # float() accepts "nan" and "inf", and nan < 0 is False
+    if quantity < 0 or not (math.isfinite(unit_price) and unit_price >= 0) or not 0 <= discount <= 100:
+        raise ValueError("value out of range")
+    description = str(row["description"])
+    try:
+        description.encode("utf-8")
+    except UnicodeEncodeError:
+        raise ValueError("not valid UTF-8") from None
+    return InvoiceItem(description, unit_price, quantity, discount)
+
+
+def parse_rows(
+    rows: Iterable[Tuple[int, Any]], on_reject: Callable[[RejectedRow], None]
+) -> Iterator[InvoiceItem]:
+    for line_no, row in rows:
+        try:
+            yield to_item(row)
+        except (KeyError, TypeError, ValueError) as e:
+            reason = f"missing field {e}" if isinstance(e, KeyError) else str(e)
+            on_reject(RejectedRow(line_no, row, reason))
+
+
+def ingest(
+    path: str,
+    chunk_size: int = 10_000,
+    on_reject: Callable[[RejectedRow], None] = lambda rejected: None,
+    make_chunk: Callable[[List[InvoiceItem]], Any] = list,
+) -> Iterator[Chunk]:
+    """
+    Stream `path` as chunks of at most chunk_size items.
+
+    Only one chunk is held in memory at a time. Pass make_chunk=InvoiceBatch.from_items
+    (11_invoice_batch.py) to get columnar batches instead of lists.
+    """
+    rejected = 0
+
+    def count_reject(row: RejectedRow) -> None:
+        nonlocal rejected
+        rejected += 1
+        on_reject(row)
+
+    items = parse_rows(read_rows(path), count_reject)
+    number = 0
+    while True:
+        start = perf_counter()
+        before = rejected
+        chunk = list(islice(items, chunk_size))
+        if not chunk and rejected == before:
+            return
+        number += 1
+        rows = len(chunk) + rejected - before
+        elapsed = perf_counter() - start
+        yield Chunk(number, make_chunk(chunk), rows, rejected - before,
+                    rows / elapsed if elapsed else float("inf"))
+
+
+workdir = tempfile.TemporaryDirectory()
+csv_path = os.path.join(workdir.name, "invoices.csv")
+ndjson_path = os.path.join(workdir.name, "invoices.ndjson")
+
+with open(csv_path, "w", newline="") as f:
+    writer = csv.writer(f)
+    writer.writerow(["description", "unit_price", "quantity", "discount_percent"])
+    for n in range(50_000):
+        writer.writerow(["Chai - Masala", 2.5, n % 6 + 1, n % 3 * 5])
+        if n % 10_000 == 0:
+            writer.writerow(["Chai - Ginger", "three rupees", 2, 0])  # bad price
+        if n == 25_000:
+            writer.writerow(["Chai - Lemon", "nan", 1, 0])
+            writer.writerow(["Chai - Lemon", 2.5, 1, "x" * (csv.field_size_limit() + 1)])
+with open(csv_path, "ab") as f:
+    f.write(b"Chai - \xff\xfe, 2.5, 1, 0\r\n")  # not UTF-8
+
+with open(ndjson_path, "w") as f:
+    f.write(json.dumps({"description": "Chai - Ginger", "unit_price": 3.0, "quantity": 2}) + "\n")
+    f.write("{not json\n")
+    f.write(json.dumps({"description": "Chai - Lemon", "quantity": 1}) + "\n")
+    f.write(json.dumps({"description": "Chai - Lemon", "unit_price": 2.0, "quantity": 1,
+                        "discount_percent": 10}) + "\n")
+
+rejects: List[RejectedRow] = []
+grand_total = 0.0
+for chunk in ingest(csv_path, chunk_size=20_000, on_reject=rejects.append):
+    grand_total += sum(item.total() for item in chunk.items)
+    print(f"chunk {chunk.number}: {len(chunk.items):,} items, {chunk.rejected} rejected, "
+          f"{chunk.rows_per_sec:,.0f} rows/s")
+print(f"csv total: {grand_total:,.2f}, rejected lines: {[r.line for r in rejects]}")
+
+rejects.clear()
+for chunk in ingest(ndjson_path, chunk_size=2, on_reject=rejects.append):
+    print(chunk.number, [item.description for item in chunk.items])
+for r in rejects:
+    print("rejected line", r.line, "->", r.reason)
+
+workdir.cleanup()
@@ -0,0 +1,279 @@
+"""
+Generator pipelines with backpressure
+
+serve_chai, full_menu and the ingestion stages in 5_streaming_invoice_ingestion.py
+are generators that pull from each other. Chained directly, only one of them
+runs at a time: while the pricing step waits for a slow lookup, nobody reads the
+next order. Pipeline runs every stage in its own thread and connects them with
+bounded queues:
+
+source -> stage -> stage -> ... -> sink
+
+- then(fn)  -> a generator stage: fn gets an iterator of items and yields items
+               (the same shape as the stages in 5_streaming_invoice_ingestion.py)
+- map(fn, workers=N, executor="thread" | "process")
+            -> fn(item) for every item, spread over a pool; results come back in
+               the original order
+- run(sink) -> sink gets an iterator over the last stage and runs in the caller
+
+Backpressure: a queue holds at most `buffer` batches of `batch` items. When a
+stage is slower than the one before it, the queue fills up and the faster stage
+waits. Memory therefore stays constant however long the stream is.
+
+Every stage reports items/sec, queue depth (average and max) and how long it
+was blocked on a full queue; a stage that is often blocked is not the
+bottleneck, the stage after it is.
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from queue import Empty, Full, Queue
+from time import perf_counter, sleep
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    seconds: float = 0.0
+    puts: int = 0
+    depth_total: int = 0
+    max_depth: int = 0
+    blocked_seconds: float = 0.0
+
+    @property
+    def items_per_sec(self) -> float:
+        return self.items / self.seconds if self.seconds else 0.0
+
+    @property
+    def mean_depth(self) -> float:
+        return self.depth_total / self.puts if self.puts else 0.0
+
+
+def _apply(fn: Callable[[Any], Any], chunk: List[Any]) -> List[Any]:
+    # module level, so a process pool can pickle it
+    return [fn(item) for item in chunk]
+
+
+class Pipeline:
+    def __init__(self, source: Iterable[Any], *, buffer: int = 8, batch: int = 256,
+                 name: str = "source") -> None:
+        if buffer < 1 or batch < 1:
+            raise ValueError("buffer and batch must be at least 1")
+        self.buffer = buffer
+        self.batch = batch
+        self._stages: List[Any] = [(name, lambda _: iter(source), None)]
+        self._stats: List[StageStats] = []
+        self._cancel = threading.Event()
+
+    def then(self, fn: Callable[[Iterator[Any]], Iterable[Any]], name: Optional[str] = None) -> "Pipeline":
+        self._stages.append((name or fn.__name__, fn, None))
+        return self
+
+    def map(self, fn: Callable[[Any], Any], *, workers: int = 1, executor: str = "thread",
+            chunk_size: int = 64, name: Optional[str] = None) -> "Pipeline":
+        if executor not in ("thread", "process"):
+            raise ValueError("executor must be 'thread' or 'process'")
+        name = name or fn.__name__
+        if workers == 1:
+            self._stages.append((name, lambda items: map(fn, items), None))
+            return self
+        make_pool = (lambda: ThreadPoolExecutor(workers)) if executor == "thread" else \
+            (lambda: ProcessPoolExecutor(workers))
+
+        def stage(items: Iterator[Any], pool: Executor) -> Iterator[Any]:
+            # At most 2 chunks per worker are in flight; the oldest one is
+            # always yielded first, so the output keeps the input order.
+            pending = deque()
+            while True:
+                chunk = list(islice(items, chunk_size))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_apply, fn, chunk))
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+        self._stages.append((name, stage, make_pool))
+        return self
+
+    def run(self, sink: Callable[[Iterator[Any]], Any]) -> Any:
+        self._cancel.clear()
+        self._stats = [StageStats(name) for name, _, _ in self._stages]
+        pools = []
+        threads = []
+        items: Iterator[Any] = iter(())
+        try:
+            for (name, fn, make_pool), stats in zip(self._stages, self._stats):
+                queue: Queue = Queue(maxsize=self.buffer)
+                if make_pool is not None:
+                    pool = make_pool()
+                    pools.append(pool)
+                    output = fn(items, pool)
+                else:
+                    output = fn(items)
+                thread = threading.Thread(target=self._pump, args=(output, queue, stats),
+                                          name=f"stage-{name}", daemon=True)
+                thread.start()
+                threads.append(thread)
+                items = self._drain(queue)
+            return sink(items)
+        finally:
+            self._cancel.set()  # stops upstream stages if the sink ended early or failed
+            for thread in threads:
+                thread.join()
+            for pool in pools:
+                pool.shutdown(cancel_futures=True)
+
+    def _pump(self, output: Iterable[Any], queue: Queue, stats: StageStats) -> None:
+        start = perf_counter()
+        try:
+            batch = []
+            for item in output:
+                batch.append(item)
+                if len(batch) >= self.batch:
+                    stats.items += len(batch)
+                    if not self._put(queue, batch, stats):
+                        return
+                    batch = []
+            stats.items += len(batch)
+            if batch and not self._put(queue, batch, stats):
+                return
+            self._put(queue, _DONE, stats)
+        except BaseException as e:
+            self._put(queue, _Failed(e), stats)
+        finally:
+            stats.seconds = perf_counter() - start
+
+    def _put(self, queue: Queue, batch: Any, stats: StageStats) -> bool:
+        depth = queue.qsize()
+        stats.puts += 1
+        stats.depth_total += depth
+        stats.max_depth = max(stats.max_depth, depth)
+        if depth < self.buffer:
+            try:
+                queue.put_nowait(batch)
+                return True
+            except Full:
+                pass
+        blocked = perf_counter()
+        try:
+            while not self._cancel.is_set():
+                try:
+                    queue.put(batch, timeout=0.05)
+                    return True
+                except Full:
+                    continue
+            return False
+        finally:
+            stats.blocked_seconds += perf_counter() - blocked
+
+    def _drain(self, queue: Queue) -> Iterator[Any]:
+        while True:
+            try:
+                batch = queue.get(timeout=0.05)
+            except Empty:
+                if self._cancel.is_set():
+                    return
+                continue
+            if batch is _DONE:
+                return
+            if isinstance(batch, _Failed):
+                raise batch.error
+            yield from batch
+
+    def stats(self) -> List[StageStats]:
+        return list(self._stats)
+
+    def report(self) -> str:
+        header = (f"{'stage':<12} {'items':>9} {'items/s':>12} {'mean depth':>11} "
+                  f"{'max depth':>10} {'blocked s':>10}")
+        lines = [header, "-" * len(header)]
+        for s in self._stats:
+            lines.append(f"{s.name:<12} {s.items:>9,} {s.items_per_sec:>12,.0f} "
+                         f"{s.mean_depth:>11.1f} {s.max_depth:>10} {s.blocked_seconds:>10.2f}")
+        return "\n".join(lines)
+
+
+# Order processing: read lines, parse them, look up prices (slow: a remote
+# price service), total everything up
+MENU = {"masala": 120, "ginger": 100, "elaichi": 110, "karak": 90}
+FLAVOURS = list(MENU)
+
+
+def order_lines(count: int) -> Iterator[str]:
+    for n in range(count):
+        yield f"{n},{FLAVOURS[n % len(FLAVOURS)]},{n % 3 + 1}"
+
+
+def parse(lines: Iterator[str]) -> Iterator[tuple]:
+    for line in lines:
+        order_id, flavour, cups = line.split(",")
+        yield int(order_id), flavour, int(cups)
+
+
+def price(order: tuple) -> tuple:
+    order_id, flavour, cups = order
+    sleep(0.0001)  # price service round trip
+    return order_id, MENU[flavour] * cups
+
+
+def cpu_price(order: tuple) -> tuple:
+    order_id, flavour, cups = order
+    total = 0
+    for n in range(300):  # stands in for real pricing rules
+        total += (n * cups) % 7
+    return order_id, MENU[flavour] * cups + total * 0
+
+
+def total_in_order(priced: Iterator[tuple]) -> int:
+    expected_id = 0
+    total = 0
+    for order_id, amount in priced:
+        assert order_id == expected_id, "orders came back out of order"
+        expected_id += 1
+        total += amount
+    return total
+
+
+if __name__ == "__main__":  # process pools re-import this file on some platforms
+    ORDERS = 20_000
+
+    start = perf_counter()
+    total = total_in_order(map(price, parse(order_lines(ORDERS))))
+    print(f"{'plain generators':<22} {ORDERS / (perf_counter() - start):>10,.0f} orders/s, total {total:,}")
+
+    pipeline = Pipeline(order_lines(ORDERS), buffer=4, batch=128).then(parse).map(price, workers=16)
+    start = perf_counter()
+    total = pipeline.run(total_in_order)
+    print(f"{'pipeline, 16 threads':<22} {ORDERS / (perf_counter() - start):>10,.0f} orders/s, total {total:,}")
+    print(pipeline.report())
+
+    # CPU-bound pricing needs processes to get around the GIL; it only speeds
+    # things up when the machine has more than one core
+    ORDERS = 100_000
+    start = perf_counter()
+    total = total_in_order(map(cpu_price, parse(order_lines(ORDERS))))
+    print(f"\n{'plain generators':<22} {ORDERS / (perf_counter() - start):>10,.0f} orders/s, total {total:,}")
+    pipeline = (Pipeline(order_lines(ORDERS)).then(parse)
+                .map(cpu_price, workers=4, executor="process", chunk_size=1000))
+    start = perf_counter()
+    total = pipeline.run(total_in_order)
+    print(f"{'pipeline, 4 processes':<22} {ORDERS / (perf_counter() - start):>10,.0f} orders/s, total {total:,}")
+    print(pipeline.report())
+
+    # A sink that stops early: upstream stages are told to stop as well
+    first = Pipeline(order_lines(10**9)).then(parse).run(lambda orders: next(orders))
+    print("\nfirst of a billion orders:", first)
@@ -0,0 +1,281 @@
+"""
+Order intake server
+
+chai_customer in 3_sending_value_to_generator.py takes one order per send() and
+prepares it right away. A real stall gets orders from many customers at once,
+and preparing chai has a fixed cost per pot, whatever the number of cups in it.
+So here:
+
+- an asyncio server listens on a Unix socket (or TCP on 127.0.0.1) and reads
+  newline-delimited orders from any number of connections
+- orders are collected into micro-batches: a batch is sent when it has
+  batch_size orders, or when its oldest order has waited max_delay seconds
+- each batch goes to a preparation station, a generator with the same send()
+  protocol as chai_customer: send(orders) -> the prepared orders
+- every order gets a reply line, in the order it arrived on its connection;
+  when preparing its batch failed, the line starts with "error:". So does the
+  reply to a line that is not UTF-8 or is longer than the reader's limit, and
+  to orders still waiting when the server closes
+
+The load generator at the bottom opens a few connections, keeps a window of
+orders in flight on each and reports orders/sec and latency percentiles.
+
+    python 7_order_intake_server.py        # Unix socket
+    python 7_order_intake_server.py tcp    # TCP
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+from collections import deque
+from dataclasses import dataclass
+from time import perf_counter, sleep
+from typing import AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Set, Tuple
+
+POT_SECONDS = 0.002  # fixed cost of one pot, however many cups are in it
+
+
+def preparation_station(name: str) -> Iterator[List[str]]:
+    """chai_customer, but one send() brings a whole batch of orders."""
+    prepared: List[str] = []
+    while True:
+        orders = yield prepared
+        sleep(POT_SECONDS)
+        prepared = [f"{name} prepared your {order}" for order in orders]
+
+
+@dataclass
+class IntakeStats:
+    orders: int = 0
+    batches: int = 0
+    failed: int = 0
+
+    @property
+    def mean_batch(self) -> float:
+        return self.orders / self.batches if self.batches else 0.0
+
+
+class OrderIntake:
+    def __init__(self, batch_size: int = 64, max_delay: float = 0.005, workers: int = 4,
+                 max_pending: int = 10_000) -> None:
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.workers = workers
+        self.max_pending = max_pending
+        self.stats = IntakeStats()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: List[asyncio.Task] = []
+        self._handlers: Set[asyncio.Task] = set()
+        self._unanswered: Set[asyncio.Future] = set()  # orders without a result yet
+
+    async def start(self, path: Optional[str] = None, port: int = 0) -> None:
+        # Queues are made here so they belong to the running event loop
+        self._incoming: asyncio.Queue = asyncio.Queue(self.max_pending)
+        self._batches: asyncio.Queue = asyncio.Queue(self.workers * 2)
+        self._tasks = [asyncio.create_task(self._batcher())]
+        self._tasks += [asyncio.create_task(self._worker(f"station {n}")) for n in range(self.workers)]
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            self._server = await asyncio.start_server(self._handle, "127.0.0.1", port)
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname()
+
+    async def close(self) -> None:
+        self._server.close()
+        # answer every order still queued or being prepared before the tasks
+        # that would have answered it go away, so no client waits forever
+        closed = ConnectionError("server is closing")
+        for future in list(self._unanswered):
+            if not future.done():
+                future.set_exception(closed)
+        tasks = self._tasks + list(self._handlers)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        self._handlers.add(asyncio.current_task())
+        replies: asyncio.Queue = asyncio.Queue()  # futures, in arrival order
+        responder = asyncio.create_task(self._respond(replies, writer))
+        try:
+            async for line in _read_lines(reader):
+                try:
+                    if line is None:
+                        raise ValueError("order line is too long")
+                    order = line.decode().strip()  # UnicodeDecodeError is a ValueError
+                except ValueError as e:
+                    # answered with "error: ..." in its turn; the connection stays up
+                    future = loop.create_future()
+                    future.set_exception(e)
+                    replies.put_nowait(future)
+                    continue
+                if not order:
+                    continue
+                future = loop.create_future()
+                replies.put_nowait(future)
+                self._unanswered.add(future)
+                future.add_done_callback(self._unanswered.discard)
+                await self._incoming.put((order, future))  # waits when the server is full
+        except asyncio.CancelledError:
+            pass  # close(): stop reading, but still write the (failed) replies below
+        finally:
+            self._handlers.discard(asyncio.current_task())
+            replies.put_nowait(None)
+            await responder
+            writer.close()
+
+    async def _respond(self, replies: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        while True:
+            future = await replies.get()
+            if future is None:
+                await writer.drain()
+                return
+            try:
+                reply = await future
+            except Exception as e:
+                reply = f"error: {e}"
+            writer.write(f"{reply}\n".encode())
+            if replies.empty():
+                await writer.drain()
+
+    async def _batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        incoming = self._incoming
+        while True:
+            batch = [await incoming.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(incoming.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(incoming.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._batches.put(batch)
+
+    async def _worker(self, name: str) -> None:
+        loop = asyncio.get_running_loop()
+        station = preparation_station(name)
+        next(station)  # start the generator, like next(stall)
+        while True:
+            batch = await self._batches.get()
+            orders = [order for order, _ in batch]
+            # preparing blocks, so it runs in a thread; one station is only
+            # ever sent one batch at a time
+            try:
+                prepared = await loop.run_in_executor(None, station.send, orders)
+                if len(prepared) != len(orders):
+                    raise RuntimeError(f"{name} prepared {len(prepared)} of {len(orders)} orders")
+            except Exception as e:
+                # fail this batch's orders instead of leaving their customers
+                # waiting, and carry on with a fresh station (a generator that
+                # raised is finished)
+                self.stats.failed += len(batch)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                station = preparation_station(name)
+                next(station)
+                continue
+            self.stats.orders += len(batch)
+            self.stats.batches += 1
+            for (_, future), result in zip(batch, prepared):
+                if not future.done():
+                    future.set_result(result)
+
+
+async def _read_lines(reader: asyncio.StreamReader) -> AsyncIterator[Optional[bytes]]:
+    """Lines from reader, like `async for line in reader`; None for a line over its limit."""
+    too_long = False
+    while True:
+        try:
+            line = await reader.readuntil(b"\n")
+        except asyncio.LimitOverrunError as e:
+            await reader.readexactly(e.consumed)  # throw away what was read of it
+            too_long = True
+            continue
+        except asyncio.IncompleteReadError as e:  # end of stream
+            if too_long or e.partial:
+                yield None if too_long else e.partial
+            return
+        # the rest of an over-long line comes back as one more "line"
+        yield None if too_long else line
+        too_long = False
+
+
+# Load generator
+FLAVOURS = ["Masala", "Ginger", "Elaichi", "Lemon"]
+Connect = Callable[[], Awaitable[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]]
+
+
+async def _customer(connect: Connect, orders: int, window: int, latencies: List[float]) -> None:
+    reader, writer = await connect()
+    sent = deque()
+    in_flight = asyncio.Semaphore(window)
+
+    async def send_orders() -> None:
+        for n in range(orders):
+            await in_flight.acquire()
+            sent.append(perf_counter())
+            writer.write(f"{FLAVOURS[n % len(FLAVOURS)]} chai\n".encode())
+            await writer.drain()
+
+    sender = asyncio.create_task(send_orders())
+    for _ in range(orders):
+        await reader.readline()
+        latencies.append(perf_counter() - sent.popleft())
+        in_flight.release()
+    await sender
+    writer.close()
+    await writer.wait_closed()
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+async def load(connect: Connect, customers: int = 8, orders: int = 2_000, window: int = 32) -> None:
+    latencies: List[float] = []
+    start = perf_counter()
+    await asyncio.gather(*(_customer(connect, orders, window, latencies) for _ in range(customers)))
+    elapsed = perf_counter() - start
+    latencies.sort()
+    print(f"  {len(latencies) / elapsed:>9,.0f} orders/s  "
+          + "  ".join(f"p{p}={percentile(latencies, p) * 1000:.1f}ms" for p in (50, 95, 99)))
+
+
+async def main(transport: str) -> None:
+    use_unix = transport == "unix" and hasattr(socket, "AF_UNIX")
+    for batch_size, max_delay in ((1, 0.0), (16, 0.002), (64, 0.005)):
+        intake = OrderIntake(batch_size=batch_size, max_delay=max_delay)
+        with tempfile.TemporaryDirectory() as folder:
+            if use_unix:
+                path = os.path.join(folder, "intake.sock")
+                await intake.start(path=path)
+                connect = lambda: asyncio.open_unix_connection(path)
+            else:
+                await intake.start()
+                host, port = intake.address[:2]
+                connect = lambda: asyncio.open_connection(host, port)
+            print(f"batch_size={batch_size}, max_delay={max_delay * 1000:.0f}ms "
+                  f"({'unix' if use_unix else 'tcp'}):")
+            await load(connect)
+            print(f"  mean batch {intake.stats.mean_batch:.1f} orders")
+            await intake.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "unix"))
@@ -0,0 +1,149 @@
+"""
+Token dispenser
+
+infinite_chai in 2_inifinite_generators.py keeps its own counter, so `refill`
+and `user2` both hand out "Refill #1". Here every stall draws its numbers from
+one TokenDispenser, shared by all threads and processes on the machine:
+
+- the high-water mark (the next number nobody has had yet) lives in a small
+  file; it is read and raised under an exclusive file lock (fcntl.flock)
+- a caller does not take the lock for every token: it leases a block of
+  `block` numbers at once and then counts through it on its own
+- each thread leases its own blocks, so threads never wait for each other
+  on the hot path
+- the new high-water mark is fsync'ed before the block is used, so numbers
+  never repeat after a crash or restart (the unused rest of a block is skipped)
+
+Numbers are unique everywhere and increase within every thread; two threads
+see interleaved blocks, not one global sequence. Unix only (fcntl).
+"""
+
+import fcntl
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import weakref
+from multiprocessing import Pool
+from time import monotonic
+from typing import Iterator, List, Tuple
+
+_MARK = struct.Struct("<Q")
+
+
+class TokenDispenser:
+    def __init__(self, path: str, block: int = 1024, durable: bool = True) -> None:
+        if block < 1:
+            raise ValueError("block must be at least 1")
+        self.path = path
+        self.block = block
+        self.durable = durable
+        self.leases = 0
+        self._closed = False
+        self._open()
+        # A forked child must not reuse the parent's blocks or its open file
+        # (flock locks belong to the open file, which a fork shares). Hooks
+        # cannot be unregistered, so a closed dispenser's hook does nothing.
+        after_fork = weakref.WeakMethod(self._reopen_in_child)
+        os.register_at_fork(after_in_child=lambda: (method := after_fork()) and method())
+
+    def _open(self) -> None:
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._local = threading.local()
+        # flock does not stop threads sharing one fd, so they take turns here
+        self._lease_lock = threading.Lock()
+
+    def _reopen_in_child(self) -> None:
+        if self._closed:
+            return
+        os.close(self._fd)  # the child's copy of the parent's fd; the parent keeps its own
+        self._open()
+
+    def _lease(self) -> Iterator[int]:
+        with self._lease_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                raw = os.pread(self._fd, _MARK.size, 0)
+                start = _MARK.unpack(raw)[0] if len(raw) == _MARK.size else 1
+                end = start + self.block
+                os.pwrite(self._fd, _MARK.pack(end), 0)
+                if self.durable:
+                    os.fsync(self._fd)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self.leases += 1
+        return iter(range(start, end))
+
+    def take(self) -> int:
+        local = self._local
+        try:
+            return next(local.tokens)
+        except (AttributeError, StopIteration):  # first call in this thread, or block used up
+            local.tokens = self._lease()
+            return next(local.tokens)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            os.close(self._fd)
+
+
+def infinite_chai(dispenser: TokenDispenser) -> Iterator[str]:
+    while True:
+        yield f"Refill #{dispenser.take()}"
+
+
+def consume(path: str, block: int, count: int) -> Tuple[float, float, List[int]]:
+    """One consumer process: take `count` tokens, report when it started and ended."""
+    dispenser = TokenDispenser(path, block)
+    take = dispenser.take
+    start = monotonic()
+    tokens = [take() for _ in range(count)]
+    end = monotonic()
+    dispenser.close()
+    return start, end, tokens
+
+
+if __name__ == "__main__":
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "refills.mark")
+
+    dispenser = TokenDispenser(path, block=4)
+    refill, user2 = infinite_chai(dispenser), infinite_chai(dispenser)
+    print([next(refill) for _ in range(3)], [next(user2) for _ in range(3)])
+
+    # Threads: no duplicates
+    seen: List[int] = []
+    threads = [threading.Thread(target=lambda: seen.extend(dispenser.take() for _ in range(5_000)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"8 threads: {len(seen):,} tokens, {len(set(seen)):,} unique")
+
+    # Restart: a new dispenser continues above everything handed out so far
+    highest = max(seen)
+    dispenser.close()
+    dispenser = TokenDispenser(path, block=4)
+    print(f"after restart: {dispenser.take()} (highest before: {highest})")
+    dispenser.close()
+
+    # Benchmark: tokens/sec for 1, 8 and 32 consumer processes
+    per_consumer = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for block in (1, 1024):
+        # block=1 takes the file lock and fsyncs for every token: keep it short
+        count = per_consumer if block > 1 else max(1, per_consumer // 200)
+        for consumers in (1, 8, 32):
+            with Pool(consumers) as pool:
+                results = pool.starmap(consume, [(path, block, count)] * consumers)
+            start = min(r[0] for r in results)
+            end = max(r[1] for r in results)
+            tokens = [token for r in results for token in r[2]]
+            assert len(set(tokens)) == len(tokens), "duplicate tokens"
+            assert all(r[2] == sorted(r[2]) for r in results), "tokens went backwards"
+            print(f"block={block:<5} consumers={consumers:<3} "
+                  f"{len(tokens) / (end - start):>12,.0f} tokens/s ({len(tokens):,} unique)")
+    shutil.rmtree(folder)
@@ -0,0 +1,86 @@
+"""
+Merging sorted generators
+
+full_menu in 4_yieldfrom_and_close_generator.py uses `yield from` to give
+everything from local_chai, then everything from imported_chai. That is fine
+for a menu, but order streams from several branches are each sorted by time,
+and we want them interleaved in time order.
+
+merge_sorted() keeps exactly one pending item per source in a heap (heapq).
+Each step yields the smallest pending item and pulls the next one from the
+same source: O(log k) work per item for k sources, and nothing is read ahead.
+So it also works on endless generators like infinite_chai.
+
+- key=...       -> compare by a key, like sorted(key=...)
+- reverse=True  -> sources are sorted descending, and so is the result
+- unique=True   -> items whose key equals the previous item's key are dropped
+                   (the same order arriving from two feeds)
+"""
+
+import heapq
+from datetime import datetime, timedelta
+from itertools import count, islice
+from time import perf_counter
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+_NOTHING = object()
+
+
+def merge_sorted(*sources: Iterable[Any], key: Optional[Callable[[Any], Any]] = None,
+                 reverse: bool = False, unique: bool = False) -> Iterator[Any]:
+    merged = heapq.merge(*sources, key=key, reverse=reverse)
+    if not unique:
+        yield from merged
+        return
+    previous = _NOTHING
+    for item in merged:
+        current = item if key is None else key(item)
+        if current != previous:
+            previous = current
+            yield item
+
+
+def local_chai():
+    yield "Ginger chai"
+    yield "Lemon chai"
+    yield "Masala chai"
+
+
+def imported_chai():
+    yield "Matcha"
+    yield "Oolong"
+
+
+def full_menu():
+    yield from merge_sorted(local_chai(), imported_chai())
+
+
+print(list(full_menu()))
+print(list(merge_sorted(reversed(list(local_chai())), ["Oolong", "Matcha"], reverse=True)))
+
+
+# Branch order streams, each sorted by time; the airport feed repeats some of
+# the downtown orders (same order id)
+def branch_orders(branch: str, first_id: int, every: int) -> Iterator[tuple]:
+    opened = datetime(2025, 1, 1, 8, 0)
+    for n in count():
+        yield opened + timedelta(seconds=n * every), first_id + n, branch
+
+
+downtown = branch_orders("downtown", 1, 7)
+airport = branch_orders("airport", 1, 7)
+campus = branch_orders("campus", 1000, 3)
+for at, order_id, branch in islice(
+        merge_sorted(downtown, airport, campus, key=lambda o: (o[0], o[1]), unique=True), 6):
+    print(at.time(), order_id, branch)
+
+
+# Benchmark: 64 branches, endless streams, take the first 500k orders
+BRANCHES = 64
+ORDERS = 500_000
+streams = [branch_orders(str(b), b * 1_000_000, b % 7 + 1) for b in range(BRANCHES)]
+start = perf_counter()
+taken = sum(1 for _ in islice(merge_sorted(*streams, key=lambda o: o[0]), ORDERS))
+elapsed = perf_counter() - start
+print(f"{BRANCHES} branches: {taken / elapsed:,.0f} orders/s, "
+      f"{BRANCHES} pending orders in memory however many are merged")
@@ -8,7 +8,7 @@ def require_admin(func):
             print("Access denied: Admins only")
             return None
         else:
-            func(user_role)
+            return func(user_role)
     return wrapper
 
 
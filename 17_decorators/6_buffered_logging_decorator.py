@@ -0,0 +1,197 @@
+"""
+Buffered, non-blocking logging decorator
+
+log_activity in 2_logging_decorator.py calls print() twice around every call, so
+the function has to wait for stdout every single time. Here the decorator only
+puts a small tuple (event, function name) into an in-memory buffer and returns.
+A background thread waits until batch_size records are queued (or
+flush_interval has passed), takes them out, formats them (only then, which is
+the "lazy" part) and writes the batch with one write() call.
+
+When the buffer is full there are two choices:
+- "drop"  -> the record is thrown away and counted in `dropped` (never waits)
+- "block" -> the caller waits until the flusher has made room (never loses logs)
+
+If writing to the stream fails, the buffer stops: the error is kept in `error`
+and reported on stderr, and from then on records are counted in `dropped`
+instead of making anyone wait for a flusher that is gone.
+"""
+
+import atexit
+import sys
+import tempfile
+import threading
+from collections import deque
+from contextlib import redirect_stdout
+from functools import wraps
+from time import perf_counter
+
+
+class LogBuffer:
+    def __init__(self, capacity=10_000, policy="drop", batch_size=512, flush_interval=0.1, stream=None):
+        if policy not in ("drop", "block"):
+            raise ValueError("policy must be 'drop' or 'block'")
+        self.capacity = capacity
+        self.policy = policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stream = stream or sys.stdout
+        self.dropped = 0
+        self.error = None  # the exception that stopped the flusher, if any
+        # deque.append/popleft are thread-safe, so the hot path takes no lock;
+        # the condition is only used by "block" callers when the buffer is full.
+        self._records = deque()
+        self._not_full = threading.Condition()
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._run, daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def push(self, record):
+        if self._closed:  # after close() or a failed write nothing is written any more
+            self.dropped += 1
+            return
+        records = self._records
+        if len(records) >= self.capacity:
+            if self.policy == "drop":
+                # no lock on purpose: under heavy contention a count may be lost,
+                # which is fine for a statistic and keeps dropping cheap
+                self.dropped += 1
+                if not self._wake.is_set():
+                    self._wake.set()
+                return
+            with self._not_full:
+                while len(records) >= self.capacity and not self._closed:
+                    self._wake.set()
+                    self._not_full.wait(self.flush_interval)
+            if self._closed:  # nobody will make room any more
+                self.dropped += 1
+                return
+        records.append(record)
+        # a full batch is ready; is_set() first so only one caller pays for set()
+        if len(records) >= self.batch_size and not self._wake.is_set():
+            self._wake.set()
+
+    def _run(self):
+        records = self._records
+        while True:
+            # let a batch build up: write once batch_size records are queued or
+            # flush_interval has passed, whichever comes first
+            if len(records) < self.batch_size and not self._closed:
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+            if not records:
+                if self._closed:
+                    return
+                continue
+            batch = [records.popleft() for _ in range(min(self.batch_size, len(records)))]
+            try:
+                self.stream.write("".join(f"{icon} {event}: {name}\n" for icon, event, name in batch))
+                self.stream.flush()
+            except Exception as e:
+                self._fail(e, len(batch))
+                return
+            with self._not_full:
+                self._not_full.notify_all()
+
+    def _fail(self, error, lost):
+        # a stream that failed once (closed, disk full, ...) usually keeps
+        # failing, so stop instead of retrying, and wake the blocked callers
+        self.error = error
+        self.dropped += lost + len(self._records)
+        self._records.clear()
+        self._closed = True
+        print(f"LogBuffer: writing to the log failed, logging stopped: {error!r}", file=sys.stderr)
+        with self._not_full:
+            self._not_full.notify_all()
+
+    def close(self):
+        """Write out everything that is left and stop the flusher thread."""
+        self._closed = True
+        self._wake.set()
+        with self._not_full:
+            self._not_full.notify_all()
+        self._flusher.join()
+
+
+def log_activity(func=None, *, buffer=None):
+    """
+    @log_activity                  -> prints right away, like 2_logging_decorator.py
+    @log_activity(buffer=my_buffer) -> only pushes records onto the buffer
+    """
+    def decorate(func):
+        name = func.__name__
+        if buffer is None:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                print(f"🚀 Calling: {name}")
+                result = func(*args, **kwargs)
+                print(f"✅ Finished: {name}")
+                return result
+            return wrapper
+
+        push = buffer.push
+        calling, finished = ("🚀", "Calling", name), ("✅", "Finished", name)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            push(calling)
+            result = func(*args, **kwargs)
+            push(finished)
+            return result
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+buffer = LogBuffer(policy="block", flush_interval=0.05)
+
+
+@log_activity(buffer=buffer)
+def brew_chai(type, milk="no"):
+    return f"Brewing {type} chai and milk status is {milk}"
+
+
+print(brew_chai("Masala"))
+buffer.close()  # waits until the two log lines above are written
+
+
+# Benchmark: calls/sec from 8 threads
+THREADS = 8
+CALLS = 20_000
+
+
+def brew(type, milk="no"):
+    return f"Brewing {type} chai and milk status is {milk}"
+
+
+def calls_per_sec(fn):
+    def worker():
+        for _ in range(CALLS):
+            fn("Masala")
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    start = perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return THREADS * CALLS / (perf_counter() - start)
+
+
+# stdout to a terminal or pipe is line buffered: one write() per printed line.
+# A line-buffered temp file behaves the same way without flooding the screen.
+with tempfile.TemporaryFile("w", buffering=1) as log_file:
+    print(f"no decorator:      {calls_per_sec(brew):>12,.0f} calls/s")
+    with redirect_stdout(log_file):
+        printing = calls_per_sec(log_activity(brew))
+    print(f"print() decorator: {printing:>12,.0f} calls/s")
+    # 8 threads doing nothing but logging outrun any single flusher thread, which
+    # only gets the GIL in between their time slices: "drop" still loses part of
+    # the records here, while "block" slows the callers down to the flusher's pace
+    for policy in ("drop", "block"):
+        buf = LogBuffer(policy=policy, stream=log_file)
+        rate = calls_per_sec(log_activity(buffer=buf)(brew))
+        buf.close()
+        print(f"buffered ({policy}):   {rate:>12,.0f} calls/s, dropped {buf.dropped:,}")
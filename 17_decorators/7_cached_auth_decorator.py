@@ -0,0 +1,156 @@
+"""
+Authorization decorator with a decision cache
+
+require_admin in 3_auth_decorator.py compares a role string on every call. In a
+real service the role lives in a user store (database, auth service), so every
+guarded call would be a round trip. Here:
+
+- the check is done by a pluggable resolver: resolver(principal, permission) -> bool
+- the answer is cached per (principal, permission) for `ttl` seconds
+- "no" answers are cached too (negative caching), usually for a shorter time
+- invalidate() / clear() drop cached decisions; hook them up to wherever roles
+  change so nobody waits for a stale answer to expire
+- the decorator accepts *args/**kwargs and returns the wrapped function's result
+"""
+
+import inspect
+import threading
+from collections import OrderedDict
+from functools import wraps
+from time import monotonic
+
+
+class DecisionCache:
+    def __init__(self, ttl=60.0, negative_ttl=5.0, max_size=10_000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._decisions = OrderedDict()  # (principal, permission) -> (allowed, expires_at)
+        self._lock = threading.Lock()  # get() reorders, so even reads change the dict
+        self.generation = 0  # bumped by invalidate()/clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, principal, permission):
+        key = (principal, permission)
+        with self._lock:
+            entry = self._decisions.get(key)
+            if entry is None or entry[1] <= monotonic():
+                self.misses += 1
+                return None
+            self._decisions.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, principal, permission, allowed, generation=None):
+        """
+        Cache a decision. Pass the `generation` read before asking the resolver:
+        if invalidate() ran in the meantime the answer may be stale and is dropped.
+        """
+        ttl = self.ttl if allowed else self.negative_ttl
+        key = (principal, permission)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._decisions[key] = (allowed, monotonic() + ttl)
+            self._decisions.move_to_end(key)
+            if len(self._decisions) > self.max_size:
+                self._decisions.popitem(last=False)
+
+    def invalidate(self, principal=None, permission=None):
+        """Drop cached decisions for a principal, a permission, or one exact pair."""
+        with self._lock:
+            self.generation += 1
+            for key in [k for k in self._decisions
+                        if (principal is None or k[0] == principal)
+                        and (permission is None or k[1] == permission)]:
+                del self._decisions[key]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._decisions.clear()
+
+
+def first_parameter(func):
+    """principal(args, kwargs) that reads func's first parameter, however it was passed."""
+    signature = inspect.signature(func)
+    name = next(iter(signature.parameters), None)
+    if name is None:
+        raise TypeError(f"{func.__name__}() takes no arguments to find the principal in")
+
+    def principal(args, kwargs):
+        # by name, never by keyword order: f(item="ali", user="sara") is sara
+        return signature.bind(*args, **kwargs).arguments[name]
+    return principal
+
+
+def requires(permission, resolver, cache=None, principal=None):
+    """
+    Guard a function with `permission`. `principal(args, kwargs)` picks who is
+    calling out of the call's arguments (by default the function's first
+    parameter, like require_admin). Denied calls print a message and return None.
+    """
+    def decorator(func):
+        who_is_calling = principal or first_parameter(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            who = who_is_calling(args, kwargs)
+            allowed = cache.get(who, permission) if cache is not None else None
+            if allowed is None:
+                generation = cache.generation if cache is not None else None
+                allowed = resolver(who, permission)
+                if cache is not None:
+                    cache.put(who, permission, allowed, generation)
+            if not allowed:
+                print(f"Access denied: {permission} only")
+                return None
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# A pretend user store; every lookup counts as one round trip
+class UserStore:
+    def __init__(self, roles):
+        self.roles = roles
+        self.lookups = 0
+        self.on_change = []  # hooks called with the user whose roles changed
+
+    def has_permission(self, user, permission):
+        self.lookups += 1
+        return permission in self.roles.get(user, ())
+
+    def grant(self, user, role):
+        self.roles.setdefault(user, set()).add(role)
+        for hook in self.on_change:
+            hook(user)
+
+
+store = UserStore({"ali": {"admin"}, "sara": {"staff"}})
+decisions = DecisionCache(ttl=60, negative_ttl=5)
+store.on_change.append(lambda user: decisions.invalidate(principal=user))
+require_admin = requires("admin", store.has_permission, decisions)
+
+
+@require_admin
+def access_tea_inventory(user, item="all"):
+    return f"{user} sees {item} tea inventory"
+
+
+print(access_tea_inventory("sara"))
+print(access_tea_inventory("ali"))
+print(access_tea_inventory("ali", item="masala"))
+print(access_tea_inventory(user="ali", item="ginger"))
+print(access_tea_inventory(item="ali", user="sara"))  # sara asking, whatever the order
+for _ in range(1_000):
+    access_tea_inventory("ali")
+print(access_tea_inventory("sara"))  # the "no" is cached as well
+print(f"store lookups: {store.lookups}, cache hits: {decisions.hits}")
+
+# Sara gets promoted; the hook drops her cached "no" right away instead of
+# making her wait for negative_ttl
+store.grant("sara", "admin")
+print(access_tea_inventory("sara"))
+print(f"store lookups: {store.lookups}")
@@ -56,7 +56,7 @@ class ChaiOrder:
 
     @classmethod
     def from_str(cls, order_string):
-        tea_type, sweetness, size = order_string.split(',')
+        tea_type, sweetness, size = (part.strip() for part in order_string.split(','))
         return cls(tea_type, sweetness, size)
 
 
@@ -0,0 +1,207 @@
+"""
+Bulk constructors
+
+from_str in 10_staticmethod_vs_classmethod.py builds one ChaiOrder from one
+string. When a whole file of orders comes in, that is millions of calls, each
+one splitting, (now) trimming and allocating three new strings, even though
+there are only a handful of different tea types, sweetness levels and sizes.
+
+Two more classmethods do it in bulk:
+
+- ChaiOrder.from_lines(lines)     -> one ChaiOrder per "Masala, 50%, Large" line
+- ChaiOrder.from_records(dicts)   -> one ChaiOrder per dict, like from_dict
+
+Both are generators, so a file of any size streams through. They trim every
+field and remember what each raw field turned into: the second time " 50%"
+shows up it is one dict lookup, and every order shares the same (interned)
+"50%" string instead of holding its own copy.
+
+With batch_size=N they yield OrderBatch objects instead: N orders stored as
+columns of small integer codes (one array per field) plus one shared list of
+the distinct values. That is 12 bytes per order instead of a whole object,
+and counting or filtering by a field never touches a string. Batches are for
+fields with few distinct values: a stream with more than DISTINCT_LIMIT of
+them raises ValueError instead of growing the value list without bound.
+
+Like from_dict, from_records takes values that are not strings as they are;
+only strings are trimmed.
+"""
+
+import sys
+from array import array
+from collections import Counter, deque
+from itertools import cycle, islice
+from time import perf_counter
+
+FIELDS = ("tea_type", "sweetness", "size")
+DISTINCT_LIMIT = 100_000  # distinct raw values remembered (and, in batches, allowed) per stream
+
+
+class ChaiOrder:
+    __slots__ = FIELDS  # no __dict__ per order: smaller and faster to create
+
+    def __init__(self, tea_type, sweetness, size):
+        self.tea_type = tea_type
+        self.sweetness = sweetness
+        self.size = size
+
+    def __repr__(self):
+        return f"ChaiOrder({self.tea_type!r}, {self.sweetness!r}, {self.size!r})"
+
+    @classmethod
+    def from_dict(cls, order_data):
+        return cls(order_data['tea_type'], order_data['sweetness'], order_data['size'])
+
+    @classmethod
+    def from_str(cls, order_string):
+        tea_type, sweetness, size = (part.strip() for part in order_string.split(','))
+        return cls(tea_type, sweetness, size)
+
+    @classmethod
+    def from_lines(cls, lines, batch_size=None):
+        if batch_size:
+            return OrderBatch.from_rows(_split_lines(lines), batch_size)
+        return cls._from_rows(_split_lines(lines))
+
+    @classmethod
+    def from_records(cls, records, batch_size=None):
+        rows = ((r['tea_type'], r['sweetness'], r['size']) for r in records)
+        if batch_size:
+            return OrderBatch.from_rows(rows, batch_size)
+        return cls._from_rows(rows)
+
+    @classmethod
+    def _from_rows(cls, rows):
+        fields = _Interner()
+        known, add = fields.values.get, fields.add
+        for tea_type, sweetness, size in rows:
+            try:
+                order = cls(known(tea_type) or add(tea_type),
+                            known(sweetness) or add(sweetness),
+                            known(size) or add(size))
+            except TypeError:  # an unhashable value from a record: keep it as it is
+                order = cls(add(tea_type), add(sweetness), add(size))
+            yield order
+
+
+def _split_lines(lines):
+    for number, line in enumerate(lines, 1):
+        row = line.split(',')
+        if len(row) != 3:
+            raise ValueError(f"line {number}: expected tea_type, sweetness, size; got {line!r}")
+        yield row
+
+
+class _Interner:
+    """raw field (" 50%\\n") -> trimmed, interned value ("50%")."""
+
+    def __init__(self, limit=DISTINCT_LIMIT):
+        self.values = {}
+        self.limit = limit  # stop remembering if the input is mostly unique values
+
+    def add(self, raw):
+        if not isinstance(raw, str):
+            return raw  # a record's number, None, ...: nothing to trim or intern
+        value = sys.intern(raw.strip())
+        if len(self.values) < self.limit:
+            self.values[raw] = value
+        return value
+
+
+class OrderBatch:
+    """Orders as columns: codes[i] is an index into `values`, which all batches share."""
+
+    __slots__ = FIELDS + ("values",)
+
+    def __init__(self, values):
+        self.values = values
+        self.tea_type = array('I')
+        self.sweetness = array('I')
+        self.size = array('I')
+
+    def __len__(self):
+        return len(self.tea_type)
+
+    def __getitem__(self, i):
+        values = self.values
+        return ChaiOrder(values[self.tea_type[i]], values[self.sweetness[i]], values[self.size[i]])
+
+    def column(self, field):
+        return [self.values[code] for code in getattr(self, field)]
+
+    def counts(self, field):
+        return Counter({self.values[code]: n for code, n in Counter(getattr(self, field)).items()})
+
+    @classmethod
+    def from_rows(cls, rows, batch_size):
+        # Meant for fields with few distinct values: every one of them gets a code
+        values = []  # code -> value, shared by every batch of this stream
+        code_of_value = {}
+        code_of_raw = {}  # a cache in front of code_of_value, like _Interner's
+
+        def add(raw):
+            value = raw.strip() if isinstance(raw, str) else raw
+            code = code_of_value.get(value)
+            if code is None:
+                if len(values) >= DISTINCT_LIMIT:
+                    raise ValueError(f"more than {DISTINCT_LIMIT:,} distinct values: "
+                                     "batches are for low-cardinality fields, use batch_size=None")
+                code = code_of_value[value] = len(values)
+                values.append(value)
+            if len(code_of_raw) < DISTINCT_LIMIT:
+                code_of_raw[raw] = code
+            return code
+
+        known = code_of_raw.get
+        rows = iter(rows)
+        while True:
+            batch = cls(values)
+            tea_type, sweetness, size = batch.tea_type.append, batch.sweetness.append, batch.size.append
+            for t, s, z in islice(rows, batch_size):
+                code = known(t)
+                tea_type(add(t) if code is None else code)
+                code = known(s)
+                sweetness(add(s) if code is None else code)
+                code = known(z)
+                size(add(z) if code is None else code)
+            if not len(batch):
+                return
+            yield batch
+
+
+order_2 = ChaiOrder.from_str('Green, 100%, Medium')
+print(order_2)  # no more ' 100%'
+print(list(ChaiOrder.from_lines(["Masala, 50%, Large", "Green,100%, Medium\n"])))
+print(list(ChaiOrder.from_records([{'tea_type': ' Masala', 'sweetness': '50%', 'size': 'Large '},
+                                   {'tea_type': 'Green', 'sweetness': 50, 'size': None}])))
+batch = next(ChaiOrder.from_lines(["Masala, 50%, Large", "Green, 100%, Medium", "Masala,0%,Small"],
+                                  batch_size=1000))
+print(len(batch), batch[2], batch.counts("tea_type"))
+
+
+# Benchmark: python 12_bulk_constructors.py 10000000 for 10M lines.
+# The lines come from memory so only the parsing is measured.
+LINES = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+samples = ["Masala, 50%, Large\n", "Green, 100%, Medium\n", "Ginger,0%,Small\n",
+           "Masala, 100%, Large\n", "Kashmiri, 25%, Medium\n"]
+
+
+def lines():
+    return islice(cycle(samples), LINES)
+
+
+def run(label, orders):
+    start = perf_counter()
+    deque(orders, maxlen=0)  # consume without keeping anything
+    print(f"{label:<28} {LINES / (perf_counter() - start):>12,.0f} lines/s")
+
+
+run("from_str per line", map(ChaiOrder.from_str, lines()))
+run("from_lines", ChaiOrder.from_lines(lines()))
+run("from_lines(batch_size=65536)", ChaiOrder.from_lines(lines(), batch_size=65_536))
+
+one = ChaiOrder.from_str(samples[0])
+own_strings = sum(sys.getsizeof(getattr(one, field)) for field in FIELDS)
+print(f"memory per order: {sys.getsizeof(one) + own_strings + 8} bytes from from_str (own strings), "
+      f"{sys.getsizeof(one) + 8} bytes from from_lines (shared strings), "
+      f"{3 * array('I').itemsize} bytes in a batch")
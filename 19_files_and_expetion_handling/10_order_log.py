@@ -0,0 +1,293 @@
+"""
+Append-only order log
+
+8_files.py saves an order with open("order.txt", "w"): every write opens the
+file, throws away what was in it (mode "w" truncates) and closes it again. For
+a stream of orders we want to keep all of them, and pay for the disk as little
+as possible. OrderLog:
+
+- only appends, to segment files 00000000000000000001.log, ... named after the
+  first order id inside; a new segment starts once one reaches segment_size
+- stores binary records: a fixed header (payload length, CRC32, order id,
+  timestamp) followed by the payload bytes
+- numbers orders itself (1, 2, 3, ...) and continues after a restart; a
+  half-written record at the end (a crash during a write) is cut off on open
+
+When an order counts as saved is the `sync` policy:
+- "always" -> write + fsync per order; the caller waits for its own fsync
+- "group"  -> group commit: the caller still waits until its order is on disk,
+              but one background write + fsync covers every order that arrived
+              in the meantime. With window > 0 the commit also waits up to
+              `window` seconds for more orders, but only while other callers
+              are waiting and new orders keep arriving, so a lone writer
+              never waits for nothing
+- "window" -> append() returns at once; a background write + fsync runs every
+              `window` seconds (5 ms unless given), so a power cut can lose
+              that much
+- "never"  -> buffered writes, the OS decides when they reach the disk
+"""
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from time import monotonic, perf_counter, sleep, time
+from typing import Iterator, List, Optional, Tuple, Union
+
+# payload length, crc32 of (order id, timestamp, payload), order id, timestamp
+HEADER = struct.Struct("<IIQd")
+SUFFIX = ".log"
+SYNC_POLICIES = ("always", "group", "window", "never")
+DEFAULT_WINDOW = {"group": 0.0, "window": 0.005}
+
+
+def segment_name(first_id: int) -> str:
+    return f"{first_id:020d}{SUFFIX}"
+
+
+def list_segments(directory: str) -> List[str]:
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.endswith(SUFFIX))
+
+
+def encode(order_id: int, timestamp: float, payload: bytes) -> bytes:
+    crc = zlib.crc32(payload, zlib.crc32(struct.pack("<Qd", order_id, timestamp)))
+    return HEADER.pack(len(payload), crc, order_id, timestamp) + payload
+
+
+def scan(path: str) -> Iterator[Tuple[int, int, float, bytes]]:
+    """(offset, order id, timestamp, payload) for every intact record, in order."""
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        length, crc, order_id, timestamp = HEADER.unpack_from(data, offset)
+        start = offset + HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(
+                payload, zlib.crc32(struct.pack("<Qd", order_id, timestamp))) != crc:
+            return  # torn or corrupt tail
+        yield offset, order_id, timestamp, payload
+        offset = start + length
+
+
+class OrderLog:
+    def __init__(self, directory: str, *, segment_size: int = 64 << 20, sync: str = "group",
+                 window: Optional[float] = None) -> None:
+        if sync not in SYNC_POLICIES:
+            raise ValueError(f"sync must be one of {SYNC_POLICIES}")
+        if window is None:
+            window = DEFAULT_WINDOW.get(sync, 0.0)
+        if window < 0 or (sync == "window" and window == 0):
+            # sleep(0) in the commit loop would spin and take the lock nonstop
+            raise ValueError('window must be >= 0, and > 0 for sync="window"')
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_size = segment_size
+        self.sync = sync
+        self.window = window
+        self.fsyncs = 0
+        self._lock = threading.Lock()
+        self._durable = threading.Condition(self._lock)
+        self._pending = bytearray()
+        self._waiters = 0  # "group" callers waiting for their commit
+        self._closed = False
+        self._error: Optional[OSError] = None  # a failed background commit (disk full, ...)
+        self._recover()
+        self._durable_id = self._next_id - 1
+        self._committer: Optional[threading.Thread] = None
+        if sync in ("group", "window"):
+            self._has_pending = threading.Event()
+            self._committer = threading.Thread(target=self._commit_loop, daemon=True)
+            self._committer.start()
+
+    def _recover(self) -> None:
+        segments = list_segments(self.directory)
+        if not segments:
+            self._next_id = 1
+            self._open_segment(1)
+            return
+        last = segments[-1]
+        end, next_id = 0, int(os.path.basename(last)[:-len(SUFFIX)])
+        for offset, order_id, _, payload in scan(last):
+            end, next_id = offset + HEADER.size + len(payload), order_id + 1
+        with open(last, "r+b") as f:
+            f.truncate(end)  # drop a half-written record, if any
+        self._next_id = next_id
+        self._file = open(last, "ab")
+        self._segment_bytes = end
+
+    def _open_segment(self, first_id: int) -> None:
+        self._file = open(os.path.join(self.directory, segment_name(first_id)), "ab")
+        self._segment_bytes = 0
+
+    def _write(self, data: bytes, fsync: bool) -> None:
+        self._file.write(data)
+        self._segment_bytes += len(data)
+        if fsync:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.fsyncs += 1
+
+    def _rotate_if_full(self, next_id: int) -> None:
+        if self._segment_bytes >= self.segment_size:
+            self._file.flush()
+            if self.sync != "never":
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._open_segment(next_id)
+
+    def append(self, order: Union[bytes, str], timestamp: Optional[float] = None) -> int:
+        """Save one order and return its order id."""
+        payload = order.encode() if isinstance(order, str) else order
+        with self._lock:
+            if self._closed:
+                raise ValueError("order log is closed")
+            if self._error is not None:
+                raise self._error
+            order_id = self._next_id
+            self._next_id += 1
+            record = encode(order_id, time() if timestamp is None else timestamp, payload)
+            if self._committer is None:  # "always" / "never": write it ourselves
+                self._write(record, fsync=self.sync == "always")
+                self._rotate_if_full(order_id + 1)
+                return order_id
+            self._pending += record
+            self._has_pending.set()
+            if self.sync == "group":
+                self._waiters += 1
+                try:
+                    while self._durable_id < order_id:
+                        if self._error is not None:
+                            raise self._error
+                        self._durable.wait()
+                finally:
+                    self._waiters -= 1
+        return order_id
+
+    def _commit_loop(self) -> None:
+        while True:
+            if self.sync == "window":
+                sleep(self.window)
+            else:
+                self._has_pending.wait()
+                if self.window:
+                    self._gather()
+            with self._lock:
+                data, self._pending = self._pending, bytearray()
+                last_id = self._next_id - 1
+                self._has_pending.clear()
+                closed = self._closed
+            if data:
+                # the file is only touched by this thread in these modes
+                try:
+                    self._write(data, fsync=True)
+                    self._rotate_if_full(last_id + 1)
+                except OSError as e:
+                    with self._lock:
+                        self._error = e
+                        self._durable.notify_all()
+                    return
+            with self._lock:
+                self._durable_id = last_id
+                self._durable.notify_all()
+            if closed:
+                return
+
+    def _gather(self) -> None:
+        """Let more orders join this commit, while other callers keep adding them."""
+        deadline = monotonic() + self.window
+        step = self.window / 8
+        with self._lock:
+            seen = len(self._pending)
+            if self._waiters <= 1:
+                return  # a lone writer: nobody to wait for
+        while monotonic() < deadline:
+            sleep(step)
+            with self._lock:
+                if len(self._pending) == seen or self._closed:
+                    return
+                seen = len(self._pending)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        if self._committer is not None:
+            self._has_pending.set()
+            self._committer.join()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+    def replay(self) -> Iterator[Tuple[int, float, bytes]]:
+        """(order id, timestamp, payload) for every saved order, oldest first."""
+        for path in list_segments(self.directory):
+            for _, order_id, timestamp, payload in scan(path):
+                yield order_id, timestamp, payload
+
+
+if __name__ == "__main__":
+    folder = tempfile.mkdtemp()
+
+    log = OrderLog(os.path.join(folder, "demo"), segment_size=64)
+    for chai in ("masala chai", "ginger chai", "lemon chai"):
+        print("saved order", log.append(chai))
+    log.close()
+    # half a record at the end, as if the machine died in the middle of a write
+    with open(list_segments(os.path.join(folder, "demo"))[-1], "ab") as f:
+        f.write(encode(99, time(), b"elaichi chai")[:10])
+    log = OrderLog(os.path.join(folder, "demo"), segment_size=64)
+    print("after restart:", log.append("karak chai"))
+    log.close()
+    print([(order_id, payload.decode()) for order_id, _, payload in log.replay()])
+    print(len(list_segments(os.path.join(folder, "demo"))), "segments")
+
+    # Benchmark: orders/sec from 8 threads. fsync is fast on this kind of VM
+    # (tens of µs); on a real disk it takes milliseconds and the gaps get wider.
+    THREADS = 8
+    per_thread = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    order = b'{"flavour": "masala", "cups": 2, "price": 120}'
+
+    def run(label: str, save) -> None:
+        threads = [threading.Thread(target=lambda: [save(order) for _ in range(per_thread)])
+                   for _ in range(THREADS)]
+        start = perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        print(f"{label:<28} {THREADS * per_thread / (perf_counter() - start):>10,.0f} orders/s")
+
+    text_file = os.path.join(folder, "order.txt")
+    text_lock = threading.Lock()
+
+    def rewrite_order_txt(data: bytes) -> None:
+        with text_lock, open(text_file, "wb") as f:  # the 8_files.py way
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    # With 8 callers at most 8 orders can wait for one commit, so on a fast
+    # disk a window gains little; it pays off when fsync is slow or when there
+    # are many more concurrent callers.
+    run('open("order.txt", "w") + fsync', rewrite_order_txt)
+    for sync, window in (("always", 0), ("group", 0), ("group", 0.001), ("window", 0.005), ("never", 0)):
+        log = OrderLog(os.path.join(folder, f"{sync}-{window}"), segment_size=1 << 20, sync=sync,
+                       window=window)
+        run(f"sync={sync}, window={window * 1000:g}ms", log.append)
+        log.close()
+        print(f"{'':<28} {log.fsyncs:>10,} fsyncs, "
+              f"{len(list_segments(log.directory))} segments")
+
+    # One writer alone: group commit costs a hand-off to the commit thread and
+    # back per order, so with nothing to group it runs a bit below fsync per
+    # order (e.g. 15k vs 18k orders/s here); it never sleeps waiting for others
+    THREADS = 1
+    for sync in ("always", "group"):
+        log = OrderLog(os.path.join(folder, f"single-{sync}"), sync=sync)
+        run(f"1 thread, sync={sync}", log.append)
+        log.close()
+    shutil.rmtree(folder)
@@ -0,0 +1,259 @@
+"""
+Reading the order log: mmap and a sparse index
+
+With order.txt (8_files.py), or by replaying 10_order_log.py, finding "order N"
+or "orders since 10:00" means reading every record from the start. Records do
+not have a fixed size, so we cannot jump straight to the Nth one. Instead:
+
+- every segment gets a small index file beside it (<segment>.idx) with the
+  order id, timestamp and file offset of every `every`-th record (sparse:
+  1/64th of the records by default)
+- a lookup binary-searches (bisect) the index, jumps to that offset and reads
+  forward at most `every` records: O(log n) instead of O(n)
+- the segment is memory-mapped, and payloads come back as memoryview slices
+  of the map: no bytes are copied until you ask for them
+- a missing or damaged index is rebuilt when the segment is opened, and an
+  index that only covers part of a segment that has grown is extended
+
+Order ids only go up within the log (OrderLog hands them out under one lock),
+so get() can always binary-search. Timestamps usually go up too, but append()
+takes a caller's timestamp as given and the clock can step back, so the index
+also records whether a segment's timestamps are in order (and the latest one).
+since() binary-searches only the segments where they are and scans the rest.
+"""
+
+import importlib
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from random import randrange
+from time import perf_counter
+from typing import Iterator, List, NamedTuple, Optional
+
+# The file name starts with a digit, so a plain `import` cannot load it
+order_log = importlib.import_module("10_order_log")
+HEADER = order_log.HEADER
+
+INDEX_SUFFIX = ".idx"
+# magic, every, bytes of the segment covered, timestamps in order?, latest timestamp
+INDEX_HEADER = struct.Struct("<4sIQ?d")
+INDEX_ENTRY = struct.Struct("<QdQ")  # order id, timestamp, offset
+INDEX_MAGIC = b"OIX2"
+
+
+class Record(NamedTuple):
+    order_id: int
+    timestamp: float
+    payload: memoryview  # a view into the mapped segment; bytes(payload) copies it
+
+
+class SegmentReader:
+    def __init__(self, path: str, every: int = 64, verify: bool = False) -> None:
+        self.path = path
+        self.every = every
+        self.verify = verify
+        self.ids = array("Q")
+        self.stamps = array("d")
+        self.offsets = array("Q")
+        size = os.path.getsize(path)
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._map) if self._map is not None else memoryview(b"")
+        self.end = 0  # end of the last intact record
+        self.ordered = True  # every timestamp >= the one before it
+        self.last_stamp = float("-inf")  # the latest timestamp in the segment
+        self._load_index()
+
+    # index -----------------------------------------------------------------
+    def _load_index(self) -> None:
+        covered = 0
+        try:
+            with open(self.path + INDEX_SUFFIX, "rb") as f:
+                raw = f.read()
+            magic, every, covered, self.ordered, self.last_stamp = INDEX_HEADER.unpack_from(raw)
+            entries = raw[INDEX_HEADER.size:]
+            if magic != INDEX_MAGIC or every != self.every or len(entries) % INDEX_ENTRY.size \
+                    or covered > len(self._view):
+                raise ValueError("index does not match the segment")
+            for order_id, stamp, offset in INDEX_ENTRY.iter_unpack(entries):
+                self.ids.append(order_id)
+                self.stamps.append(stamp)
+                self.offsets.append(offset)
+        except (OSError, ValueError, struct.error):
+            self.ids, self.stamps, self.offsets = array("Q"), array("d"), array("Q")
+            self.ordered, self.last_stamp = True, float("-inf")
+            covered = 0
+        self.end = covered
+        if covered < len(self._view):
+            self._extend_index()
+
+    def _extend_index(self) -> None:
+        """Index records from self.end to the end of the segment, then save the index."""
+        # count the records after the last entry, so the every-th spacing continues
+        count = 0
+        if self.offsets:
+            offset = self.offsets[-1]
+            while offset < self.end:
+                offset = self._next_offset(offset)
+                count += 1
+        offset = self.end
+        view = self._view
+        while offset + HEADER.size <= len(view):
+            length, crc, order_id, stamp = HEADER.unpack_from(view, offset)
+            end = offset + HEADER.size + length
+            if end > len(view) or not self._intact(offset, length, crc, order_id, stamp):
+                break  # torn tail: the writer cuts it off on its next open
+            if stamp < self.last_stamp:
+                self.ordered = False
+            else:
+                self.last_stamp = stamp
+            if count % self.every == 0:
+                self.ids.append(order_id)
+                self.stamps.append(stamp)
+                self.offsets.append(offset)
+            count += 1
+            offset = end
+        self.end = offset
+        self._save_index()
+
+    def _save_index(self) -> None:
+        parts = [INDEX_HEADER.pack(INDEX_MAGIC, self.every, self.end, self.ordered, self.last_stamp)]
+        parts += [INDEX_ENTRY.pack(*entry) for entry in zip(self.ids, self.stamps, self.offsets)]
+        tmp = self.path + INDEX_SUFFIX + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(parts))
+        os.replace(tmp, self.path + INDEX_SUFFIX)  # readers never see half an index
+
+    def _intact(self, offset: int, length: int, crc: int, order_id: int, stamp: float) -> bool:
+        start = offset + HEADER.size
+        seed = zlib.crc32(struct.pack("<Qd", order_id, stamp))
+        return zlib.crc32(self._view[start:start + length], seed) == crc
+
+    def _next_offset(self, offset: int) -> int:
+        return offset + HEADER.size + HEADER.unpack_from(self._view, offset)[0]
+
+    # reading -----------------------------------------------------------------
+    def _record(self, offset: int) -> Record:
+        length, crc, order_id, stamp = HEADER.unpack_from(self._view, offset)
+        if self.verify and not self._intact(offset, length, crc, order_id, stamp):
+            raise ValueError(f"corrupt record at {self.path}:{offset}")
+        start = offset + HEADER.size
+        return Record(order_id, stamp, self._view[start:start + length])
+
+    def _records_from(self, offset: int) -> Iterator[Record]:
+        while offset < self.end:
+            record = self._record(offset)
+            yield record
+            offset += HEADER.size + len(record.payload)
+
+    def get(self, order_id: int) -> Optional[Record]:
+        entry = bisect_right(self.ids, order_id) - 1
+        if entry < 0:
+            return None
+        # walk the headers only; a Record is built for the match alone
+        view, unpack, offset = self._view, HEADER.unpack_from, self.offsets[entry]
+        while offset < self.end:
+            length, _, found, _ = unpack(view, offset)
+            if found >= order_id:
+                return self._record(offset) if found == order_id else None
+            offset += HEADER.size + length
+        return None
+
+    def since(self, timestamp: float) -> Iterator[Record]:
+        """Records stamped at/after timestamp, in log order."""
+        if not self.offsets:
+            return
+        # the entry before the first one at/after timestamp may hide later records;
+        # with timestamps out of order any record may qualify, so read them all
+        entry = max(bisect_left(self.stamps, timestamp) - 1, 0) if self.ordered else 0
+        for record in self._records_from(self.offsets[entry]):
+            if record.timestamp >= timestamp:
+                yield record
+
+    def close(self) -> None:
+        # fails with BufferError while Record payloads from this segment are alive
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+class OrderLogReader:
+    def __init__(self, directory: str, every: int = 64, verify: bool = False) -> None:
+        self.segments: List[SegmentReader] = [
+            SegmentReader(path, every, verify) for path in order_log.list_segments(directory)
+        ]
+        self._first_ids = [int(os.path.basename(s.path)[:-len(order_log.SUFFIX)]) for s in self.segments]
+        # can since() skip the segments before the one holding the timestamp?
+        stamped = [s for s in self.segments if s.stamps]
+        self.ordered = all(s.ordered for s in stamped) and all(
+            a.last_stamp <= b.stamps[0] for a, b in zip(stamped, stamped[1:]))
+
+    def get(self, order_id: int) -> Optional[Record]:
+        segment = bisect_right(self._first_ids, order_id) - 1
+        return self.segments[segment].get(order_id) if segment >= 0 else None
+
+    def since(self, timestamp: float) -> Iterator[Record]:
+        start = 0
+        if self.ordered:
+            first_stamps = [s.stamps[0] if s.stamps else float("inf") for s in self.segments]
+            start = max(bisect_left(first_stamps, timestamp) - 1, 0)
+        for segment in self.segments[start:]:
+            yield from segment.since(timestamp)
+
+    def close(self) -> None:
+        for segment in self.segments:
+            segment.close()
+
+
+if __name__ == "__main__":
+    folder = tempfile.mkdtemp()
+    ORDERS = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    OPENED = 1_735_718_400.0  # 2025-01-01 08:00 UTC; one order every 0.1 s
+
+    log = order_log.OrderLog(folder, segment_size=8 << 20, sync="never")
+    for n in range(ORDERS):
+        log.append(f'{{"order": {n + 1}, "flavour": "masala", "cups": {n % 3 + 1}}}',
+                   timestamp=OPENED + n / 10)
+    log.close()
+    size = sum(os.path.getsize(p) for p in order_log.list_segments(folder))
+    print(f"{ORDERS:,} orders in {len(order_log.list_segments(folder))} segments, {size / 1e6:.0f} MB")
+
+    start = perf_counter()
+    reader = OrderLogReader(folder)
+    print(f"first open (builds the indexes): {(perf_counter() - start) * 1000:8.1f} ms")
+    reader.close()
+    start = perf_counter()
+    reader = OrderLogReader(folder)
+    print(f"second open (loads them):        {(perf_counter() - start) * 1000:8.1f} ms")
+
+    record = reader.get(123_456 % ORDERS + 1)
+    print(record.order_id, bytes(record.payload).decode())
+    del record  # the payload view keeps the map alive until released
+
+    LOOKUPS = 100_000
+    wanted = [randrange(1, ORDERS + 1) for _ in range(LOOKUPS)]
+    start = perf_counter()
+    found = sum(reader.get(order_id).order_id == order_id for order_id in wanted)
+    elapsed = perf_counter() - start
+    print(f"get(order id): {LOOKUPS / elapsed:>10,.0f} lookups/s ({found:,} found)")
+
+    SCANS = 5
+    start = perf_counter()
+    for order_id in wanted[:SCANS]:
+        next(r for r in log.replay() if r[0] == order_id)
+    elapsed = perf_counter() - start
+    print(f"full replay:   {SCANS / elapsed:>10,.1f} lookups/s")
+
+    since = OPENED + (ORDERS - 1_000) / 10
+    start = perf_counter()
+    last_thousand = sum(1 for _ in reader.since(since))
+    print(f"since(T): {last_thousand:,} orders in {(perf_counter() - start) * 1000:.2f} ms")
+    reader.close()
+    shutil.rmtree(folder)
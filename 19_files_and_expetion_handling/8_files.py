@@ -13,3 +13,6 @@
 
 with open("order.txt", "w") as file:
     file.write("ginger chai")
+
+# "w" starts the file over on every open; to keep a stream of orders, append
+# them to a log instead (see 10_order_log.py)
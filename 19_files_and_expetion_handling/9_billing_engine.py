@@ -0,0 +1,101 @@
+"""
+Billing engine: errors as values
+
+bill() in 7_mini_project.py builds the menu dict on every call and raises an
+exception for every bad order. Raising and catching is fine for something that
+is truly exceptional, but when a few percent of all orders are bad it becomes
+a real cost on the hot path.
+
+BillingEngine loads the menu once into a read-only index and prices a whole
+batch of (flavour, cups) orders in one call. A bad order does not raise: its
+total comes back as None and the reason is recorded in `errors`.
+"""
+
+from time import perf_counter
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+
+class InvalidChaiError(Exception):
+    pass
+
+
+class BatchBill(NamedTuple):
+    totals: List[Optional[int]]  # one per order, None when the order was rejected
+    errors: Dict[int, str]  # order index -> reason, only for rejected orders
+
+    @property
+    def grand_total(self) -> int:
+        return sum(total for total in self.totals if total is not None)
+
+
+class BillingEngine:
+    def __init__(self, menu: Mapping[str, int]) -> None:
+        self.menu = MappingProxyType(dict(menu))  # copied once, cannot be changed
+
+    def price_batch(self, orders: Sequence[Tuple[str, object]]) -> BatchBill:
+        price_of = self.menu.get
+        # One tight pass for the prices; bad orders simply come out as None.
+        totals = [
+            price * cups
+            if (price := price_of(flavour)) is not None
+            and (cups.__class__ is int or isinstance(cups, int))
+            else None
+            for flavour, cups in orders
+        ]
+        # Second pass only explains the (few) rejected orders.
+        errors = {}
+        for i, total in enumerate(totals):
+            if total is None:
+                flavour, cups = orders[i]
+                if flavour not in self.menu:
+                    errors[i] = "that chai is not available"
+                else:
+                    errors[i] = "Number of cups must be an integer"
+        return BatchBill(totals, errors)
+
+
+engine = BillingEngine({"masala": 20, "ginger": 40})
+orders = [("mint", 2), ("masala", "three"), ("ginger", 3)]
+result = engine.price_batch(orders)
+for i, (flavour, cups) in enumerate(orders):
+    if i in result.errors:
+        print(f"Error: {result.errors[i]}")
+    else:
+        print(f"Your bill for {cups} cups of {flavour} chai: rupees {result.totals[i]}")
+print("grand total:", result.grand_total)
+
+
+# Throughput: the exception-based bill() (without the prints) vs the engine
+def bill(flavour, cups):
+    menu = {"masala": 20, "ginger": 40}
+    if flavour not in menu:
+        raise InvalidChaiError("that chai is not available")
+    if not isinstance(cups, int):
+        raise TypeError("Number of cups must be an integer")
+    return menu[flavour] * cups
+
+
+ORDERS = 500_000
+for bad_share in (0.0, 0.05, 0.5):
+    every = int(1 / bad_share) if bad_share else 0
+    orders = [
+        ("mint", 2) if every and n % every == 0 else ("masala" if n % 2 else "ginger", n % 4 + 1)
+        for n in range(ORDERS)
+    ]
+
+    start = perf_counter()
+    results = []
+    for flavour, cups in orders:
+        try:
+            results.append(bill(flavour, cups))
+        except (InvalidChaiError, TypeError) as e:
+            results.append(e)
+    per_call = perf_counter() - start
+
+    start = perf_counter()
+    engine.price_batch(orders)
+    batched = perf_counter() - start
+
+    print(f"{bad_share:4.0%} invalid: bill() {ORDERS / per_call:>12,.0f} orders/s, "
+          f"engine {ORDERS / batched:>12,.0f} orders/s")
@@ -0,0 +1,164 @@
+"""
+Compact records: slots=True and tuple-backed dataclasses
+
+- A regular dataclass instance carries its own __dict__ (a whole hash table)
+- slots=True stores the fields in fixed slots instead: less memory, faster
+  attribute access, same generated __init__/__repr__/__eq__/ordering
+- A NamedTuple is also compact and immutable, but it IS a tuple: it equals a
+  plain tuple with the same values and unpacks/iterates like one
+- Benchmark: memory and attribute access for Person, Car, Score and InvoiceItem
+
+Running the file measures 200,000 instances of each (bytes per instance do not
+change with the count). For the full run:
+python 13_slots_and_compact_records.py 1000000 10000000
+"""
+
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from operator import attrgetter
+from time import perf_counter
+from typing import NamedTuple
+
+
+# Current classes (files 1, 2, 8 and 10)
+@dataclass
+class Person:
+    name: str
+    age: int
+
+
+@dataclass
+class Car:
+    make: str
+    model: str
+    year: int
+
+
+@dataclass(order=True)
+class Score:
+    points: int
+    name: str
+
+
+@dataclass
+class InvoiceItem:
+    description: str
+    unit_price: float
+    quantity: int
+    discount_percent: float = 0.0  # 0-100
+
+    def total(self) -> float:
+        subtotal = self.unit_price * self.quantity
+        discount = subtotal * (self.discount_percent / 100.0)
+        return round(subtotal - discount, 2)
+
+
+# Slotted variants: one keyword, everything else is generated the same way
+@dataclass(slots=True)
+class SlotPerson:
+    name: str
+    age: int
+
+
+@dataclass(slots=True)
+class SlotCar:
+    make: str
+    model: str
+    year: int
+
+
+@dataclass(order=True, slots=True)
+class SlotScore:
+    points: int
+    name: str
+
+
+@dataclass(slots=True)
+class SlotInvoiceItem:
+    description: str
+    unit_price: float
+    quantity: int
+    discount_percent: float = 0.0  # 0-100
+
+    def total(self) -> float:
+        subtotal = self.unit_price * self.quantity
+        discount = subtotal * (self.discount_percent / 100.0)
+        return round(subtotal - discount, 2)
+
+
+# Tuple-backed variants (immutable, ordered like tuples of their fields)
+class TuplePerson(NamedTuple):
+    name: str
+    age: int
+
+
+class TupleCar(NamedTuple):
+    make: str
+    model: str
+    year: int
+
+
+class TupleScore(NamedTuple):
+    points: int
+    name: str
+
+
+class TupleInvoiceItem(NamedTuple):
+    description: str
+    unit_price: float
+    quantity: int
+    discount_percent: float = 0.0  # 0-100
+
+    def total(self) -> float:
+        subtotal = self.unit_price * self.quantity
+        discount = subtotal * (self.discount_percent / 100.0)
+        return round(subtotal - discount, 2)
+
+
+# Same behaviour as the originals
+print(SlotPerson("Ali", 30), SlotCar("Toyota", "Corolla", 2020) == SlotCar("Toyota", "Corolla", 2020))
+print(sorted([SlotScore(90, "Zain"), SlotScore(75, "Sara"), SlotScore(90, "Ali")]))
+print(sorted([TupleScore(90, "Zain"), TupleScore(75, "Sara"), TupleScore(90, "Ali")]))
+print(SlotInvoiceItem("Chai - Ginger", 3.0, 2, 10).total(), TupleInvoiceItem("Chai - Ginger", 3.0, 2, 10).total())
+print("has __dict__:", hasattr(Person("Ali", 30), "__dict__"), hasattr(SlotPerson("Ali", 30), "__dict__"))
+print("tuple gotcha:", TuplePerson("Ali", 30) == ("Ali", 30), Person("Ali", 30) == ("Ali", 30))
+
+
+def measure(make, n: int, field: str):
+    """
+    Bytes per instance while n instances are alive, and ns per attribute read.
+    The bytes include the list slot and the int field, which are the same for
+    every variant, so compare the columns rather than the absolute numbers.
+    """
+    tracemalloc.start()
+    objects = [make(i) for i in range(n)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    read = attrgetter(field)
+    start = perf_counter()
+    for obj in objects:
+        read(obj)
+    elapsed = perf_counter() - start
+    return size / n, elapsed / n * 1e9
+
+
+RECORDS = [
+    ("Person", "age", lambda i: Person("Ali", i), lambda i: SlotPerson("Ali", i),
+     lambda i: TuplePerson("Ali", i)),
+    ("Car", "year", lambda i: Car("Toyota", "Corolla", i), lambda i: SlotCar("Toyota", "Corolla", i),
+     lambda i: TupleCar("Toyota", "Corolla", i)),
+    ("Score", "points", lambda i: Score(i, "Ali"), lambda i: SlotScore(i, "Ali"),
+     lambda i: TupleScore(i, "Ali")),
+    ("InvoiceItem", "quantity", lambda i: InvoiceItem("Chai", 2.5, i),
+     lambda i: SlotInvoiceItem("Chai", 2.5, i), lambda i: TupleInvoiceItem("Chai", 2.5, i)),
+]
+
+sizes = [int(arg) for arg in sys.argv[1:]] or [200_000]
+for n in sizes:
+    print(f"\n{n:,} instances   bytes/instance (dict | slots | tuple)   attribute ns (dict | slots | tuple)")
+    for name, field, *makers in RECORDS:
+        results = [measure(make, n, field) for make in makers]
+        memory = " | ".join(f"{m:5.0f}" for m, _ in results)
+        access = " | ".join(f"{a:5.1f}" for _, a in results)
+        print(f"{name:<12} {memory:>38}   {access:>34}")
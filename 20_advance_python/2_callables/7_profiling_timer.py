@@ -0,0 +1,372 @@
+"""
+From Timer to a profiling registry
+
+- Timer in file 4 prints one line per call; printing costs more than most of
+  the functions it wraps, and there is nothing to aggregate afterwards
+- Profiler keeps, per function: call count, timed count, total and max time
+  and a log-linear (HDR-style) latency histogram for p50/p95/p99
+- sample_every=N times only every Nth call; the others are just counted
+- report() prints a table, export() returns plain dicts (e.g. for json.dumps)
+- Coroutines, generators and async generators are timed until they finish,
+  not until they return a coroutine/generator object; for (async) generators
+  the time to the first item is kept as well
+
+Overhead on a no-op function is measured at the bottom of the file (best of 5
+runs). A timed call costs the __call__ dispatch, two perf_counter_ns() reads and
+a list append; the histogram is updated in bulk every 4096 samples. That stays
+under 1 µs on CPython 3.11 (about 0.8 µs on a VM where one clock read alone is
+~170 ns). An unsampled call only pays the dispatch and a counter.
+"""
+
+import asyncio
+import inspect
+from functools import wraps
+from time import perf_counter, perf_counter_ns, sleep
+from typing import Callable, Dict, List, Optional
+
+
+# Histogram buckets: values below 64ns are exact; above that every power of two
+# is split into 32 sub-buckets, so a bucket is at most ~3% wide.
+_SUB_BITS = 5
+_SUB = 1 << _SUB_BITS
+_BUCKETS = 64 * _SUB  # enough for ~2^62 ns
+
+
+def _bucket(ns: int) -> int:
+    shift = ns.bit_length() - _SUB_BITS - 1
+    if shift <= 0:
+        return ns
+    return shift * _SUB + (ns >> shift)
+
+
+# Most calls finish in under 65µs, so their bucket is a plain list lookup.
+_LUT_SIZE = 1 << 16
+_LUT = [_bucket(ns) for ns in range(_LUT_SIZE)]
+# Timed calls only append to a list; it is folded into the histogram in bulk.
+_FOLD_AT = 4096
+
+
+def _bucket_upper(index: int) -> int:
+    if index < 2 * _SUB:
+        return index
+    shift = index // _SUB - 1
+    return ((index - shift * _SUB + 1) << shift) - 1
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        # in place: timers keep a reference to this object
+        self.timed = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.counts: List[int] = [0] * _BUCKETS
+        self.pending: List[int] = []
+
+    def add(self, ns: int) -> None:
+        pending = self.pending
+        pending.append(ns)
+        if len(pending) >= _FOLD_AT:
+            self.fold()
+
+    def fold(self) -> None:
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+        self.timed += len(pending)
+        self.total_ns += sum(pending)
+        self.max_ns = max(self.max_ns, max(pending))
+        counts, lut = self.counts, _LUT
+        for ns in pending:
+            counts[lut[ns] if ns < _LUT_SIZE else _bucket(ns)] += 1
+
+    def percentile(self, p: float) -> int:
+        """Upper edge (ns) of the bucket holding the p-th percentile."""
+        self.fold()
+        if not self.timed:
+            return 0
+        rank = max(1, round(self.timed * p / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(_bucket_upper(index), self.max_ns)
+        return self.max_ns
+
+
+class FunctionStats:
+    """
+    latency    -> wall time until the call is complete: the return for plain
+                  functions, the awaited result for coroutines, exhaustion
+                  (or close) for generators
+    first_item -> time until a generator / async generator produced its first
+                  item; stays empty for everything else
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.latency = Histogram()
+        self.first_item = Histogram()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.latency.reset()
+        self.first_item.reset()
+
+    def as_dict(self) -> Dict[str, float]:
+        latency, first = self.latency, self.first_item
+        latency.fold()
+        first.fold()
+        row = {
+            "calls": self.calls,
+            "timed": latency.timed,
+            "mean_us": latency.total_ns / latency.timed / 1000 if latency.timed else 0.0,
+            "p50_us": latency.percentile(50) / 1000,
+            "p95_us": latency.percentile(95) / 1000,
+            "p99_us": latency.percentile(99) / 1000,
+            "max_us": latency.max_ns / 1000,
+        }
+        if first.timed:
+            row["first_item_p50_us"] = first.percentile(50) / 1000
+            row["first_item_p99_us"] = first.percentile(99) / 1000
+        return row
+
+
+class Timer:
+    def __init__(self, fn, stats: FunctionStats, sample_every: int = 1):
+        wraps(fn)(self)
+        self._fn = fn
+        self._stats = stats
+        self._latency = stats.latency
+        self._sample_every = sample_every
+
+    def __call__(self, *args, **kwargs):
+        stats = self._stats
+        stats.calls += 1
+        if stats.calls % self._sample_every:
+            return self._fn(*args, **kwargs)
+        start = perf_counter_ns()
+        try:
+            return self._fn(*args, **kwargs)
+        finally:
+            pending = self._latency.pending
+            pending.append(perf_counter_ns() - start)
+            if len(pending) >= _FOLD_AT:
+                self._latency.fold()
+
+
+class CoroutineTimer(Timer):
+    async def __call__(self, *args, **kwargs):
+        stats = self._stats
+        stats.calls += 1
+        if stats.calls % self._sample_every:
+            return await self._fn(*args, **kwargs)
+        start = perf_counter_ns()
+        try:
+            return await self._fn(*args, **kwargs)
+        finally:
+            self._latency.add(perf_counter_ns() - start)
+
+
+class GeneratorTimer(Timer):
+    # The clock starts when the consumer first advances the generator, because
+    # that is when the generator body starts running.
+
+    def __call__(self, *args, **kwargs):
+        stats = self._stats
+        stats.calls += 1
+        gen = self._fn(*args, **kwargs)
+        if stats.calls % self._sample_every:
+            return gen
+        return self._timed(gen)
+
+    def _timed(self, gen):
+        stats = self._stats
+        start = perf_counter_ns()
+        first = True
+        method, arg = gen.send, None
+        try:
+            while True:
+                try:
+                    item = method(arg)
+                except StopIteration as stop:
+                    return stop.value
+                if first:
+                    stats.first_item.add(perf_counter_ns() - start)
+                    first = False
+                try:
+                    arg = yield item
+                    method = gen.send
+                except GeneratorExit:
+                    gen.close()
+                    raise
+                except BaseException as e:  # forward .throw() to the wrapped generator
+                    method, arg = gen.throw, e
+        finally:
+            stats.latency.add(perf_counter_ns() - start)
+
+
+class AsyncGeneratorTimer(Timer):
+    def __call__(self, *args, **kwargs):
+        stats = self._stats
+        stats.calls += 1
+        agen = self._fn(*args, **kwargs)
+        if stats.calls % self._sample_every:
+            return agen
+        return self._timed(agen)
+
+    async def _timed(self, agen):
+        stats = self._stats
+        start = perf_counter_ns()
+        first = True
+        method, arg = agen.asend, None
+        try:
+            while True:
+                try:
+                    item = await method(arg)
+                except StopAsyncIteration:
+                    return
+                if first:
+                    stats.first_item.add(perf_counter_ns() - start)
+                    first = False
+                try:
+                    arg = yield item
+                    method = agen.asend
+                except GeneratorExit:
+                    await agen.aclose()
+                    raise
+                except BaseException as e:
+                    method, arg = agen.athrow, e
+        finally:
+            stats.latency.add(perf_counter_ns() - start)
+
+
+class Profiler:
+    def __init__(self) -> None:
+        self._stats: Dict[str, FunctionStats] = {}
+
+    def timer(self, fn: Optional[Callable] = None, *, sample_every: int = 1):
+        """
+        Use as @profiler.timer or @profiler.timer(sample_every=100).
+        Works on plain functions, coroutine functions, generators and async generators.
+        """
+        if sample_every < 1:
+            raise ValueError("sample_every must be at least 1")
+
+        def decorate(fn: Callable) -> Timer:
+            name = f"{fn.__module__}.{fn.__qualname__}"
+            stats = self._stats.setdefault(name, FunctionStats(name))
+            if inspect.iscoroutinefunction(fn):
+                return CoroutineTimer(fn, stats, sample_every)
+            if inspect.isasyncgenfunction(fn):
+                return AsyncGeneratorTimer(fn, stats, sample_every)
+            if inspect.isgeneratorfunction(fn):
+                return GeneratorTimer(fn, stats, sample_every)
+            return Timer(fn, stats, sample_every)
+
+        return decorate(fn) if fn is not None else decorate
+
+    def export(self) -> Dict[str, Dict[str, float]]:
+        return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+    def report(self) -> str:
+        header = (
+            f"{'function':<30} {'calls':>9} {'timed':>9} {'p50 µs':>9} {'p95 µs':>9} "
+            f"{'p99 µs':>9} {'max µs':>9} {'1st p50 µs':>11}"
+        )
+        lines = [header, "-" * len(header)]
+        for name, row in self.export().items():
+            first = row.get("first_item_p50_us")
+            lines.append(
+                f"{name:<30} {row['calls']:>9} {row['timed']:>9} {row['p50_us']:>9.2f} "
+                f"{row['p95_us']:>9.2f} {row['p99_us']:>9.2f} {row['max_us']:>9.2f} "
+                f"{'-' if first is None else f'{first:.2f}':>11}"
+            )
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        for stats in self._stats.values():
+            stats.reset()
+
+
+profiler = Profiler()
+
+
+@profiler.timer
+def slow_add(a: int, b: int) -> int:
+    total = 0
+    for _ in range(1_0000):
+        total += 1
+    return a + b + total * 0
+
+
+@profiler.timer(sample_every=10)
+def brew(flavour: str) -> str:
+    return f"{flavour} chai"
+
+
+for n in range(200):
+    slow_add(n, 1)
+for n in range(10_000):
+    brew("masala")
+
+
+
+# serve_chai from 16_generators: the call returns instantly, the cups do not
+@profiler.timer
+def serve_chai():
+    sleep(0.01)
+    yield "Cup 1: Masala chai"
+    sleep(0.01)
+    yield "Cup 2: Ginger chai"
+    sleep(0.01)
+    yield "Cup 3: Elaichi chai"
+
+
+@profiler.timer
+async def fetch_order(n: int) -> str:
+    await asyncio.sleep(0.005)
+    return f"order {n}"
+
+
+@profiler.timer
+async def order_feed():
+    for n in range(3):
+        await asyncio.sleep(0.005)
+        yield n
+
+
+async def async_work() -> None:
+    await asyncio.gather(*(fetch_order(n) for n in range(10)))
+    async for _ in order_feed():
+        pass
+
+
+for _ in range(5):
+    for cup in serve_chai():
+        pass
+asyncio.run(async_work())
+
+print(profiler.report())
+print(profiler.export()["__main__.brew"])
+
+
+# Overhead of the decorator itself, on a function that does nothing
+def noop() -> None:
+    pass
+
+
+timed_noop = profiler.timer(noop)
+sampled_noop = profiler.timer(sample_every=1000)(noop)
+CALLS = 200_000
+for label, fn in (("bare", noop), ("timed", timed_noop), ("1-in-1000", sampled_noop)):
+    best = float("inf")
+    for _ in range(5):
+        start = perf_counter()
+        for _ in range(CALLS):
+            fn()
+        best = min(best, perf_counter() - start)
+    print(f"{label:>10}: {best / CALLS * 1e9:6.0f} ns per call")
@@ -0,0 +1,189 @@
+"""
+Batch strategy dispatch
+
+- strategies in 5_practical_examples.py: look up a callable by name, call it once
+- batch_version: lets a strategy declare a batch implementation
+  (lists of a and b in, list of results out)
+- Dispatcher: takes many (strategy_name, a, b) operations, groups them by
+  strategy, runs each group in one batch call (or map() over the scalar
+  callable when there is no batch version) and puts results back in order
+- Per-strategy counters: operations, batches, time and throughput
+"""
+
+from dataclasses import dataclass
+from operator import add as _add, mul as _mul
+from time import perf_counter, sleep
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+Scalar = Callable[[int, int], int]
+Batch = Callable[[Sequence[int], Sequence[int]], List[int]]
+
+
+def batch_version(scalar: Scalar) -> Callable[[Batch], Batch]:
+    """
+    @batch_version(add) registers the decorated function as the batch version
+    of add. It is stored on add itself, so add stays a plain function.
+    """
+    def register(batch: Batch) -> Batch:
+        scalar.batch = batch
+        return batch
+    return register
+
+
+@dataclass
+class StrategyStats:
+    operations: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def ops_per_sec(self) -> float:
+        return self.operations / self.seconds if self.seconds else 0.0
+
+
+class Dispatcher:
+    def __init__(self, strategies: Dict[str, Callable[[int, int], int]]) -> None:
+        # "compile" once: name -> (scalar callable, batch callable or None)
+        self._table = {
+            name: (fn, getattr(fn, "batch", None)) for name, fn in strategies.items()
+        }
+        self.stats: Dict[str, StrategyStats] = {name: StrategyStats() for name in strategies}
+
+    def run(self, operations: Iterable[Tuple[str, int, int]]) -> List[int]:
+        operations = operations if isinstance(operations, list) else list(operations)
+        groups: Dict[str, Tuple[List[int], List[int]]] = {}
+        for name, a, b in operations:
+            group = groups.get(name)
+            if group is None:
+                if name not in self._table:
+                    raise KeyError(f"unknown strategy: {name!r}")
+                group = groups[name] = ([], [])
+            group[0].append(a)
+            group[1].append(b)
+
+        # Each group keeps the input order, so walking the operations once more
+        # and taking the next result of the right group restores the order.
+        next_result = {}
+        for name, (a_values, b_values) in groups.items():
+            scalar, batch = self._table[name]
+            start = perf_counter()
+            if batch is not None:
+                out = batch(a_values, b_values)
+            else:
+                out = list(map(scalar, a_values, b_values))
+            stats = self.stats[name]
+            stats.seconds += perf_counter() - start
+            stats.operations += len(a_values)
+            stats.batches += 1
+            next_result[name] = iter(out).__next__
+        return [next_result[op[0]]() for op in operations]
+
+
+def add(a: int, b: int) -> int:
+    return a + b
+
+
+def mul(a: int, b: int) -> int:
+    return a * b
+
+
+def sub(a: int, b: int) -> int:
+    return a - b
+
+
+def with_vat(price_cents: int, rate_bp: int) -> int:
+    """Pricing rule: price plus VAT in basis points, rounded half up to a cent."""
+    return (price_cents * (10_000 + rate_bp) + 5_000) // 10_000
+
+
+@batch_version(add)
+def add_many(a: Sequence[int], b: Sequence[int]) -> List[int]:
+    return list(map(_add, a, b))
+
+
+@batch_version(mul)
+def mul_many(a: Sequence[int], b: Sequence[int]) -> List[int]:
+    return list(map(_mul, a, b))
+
+
+@batch_version(with_vat)
+def with_vat_many(prices: Sequence[int], rates: Sequence[int]) -> List[int]:
+    if np is not None:
+        p = np.asarray(prices, dtype=np.int64)
+        r = np.asarray(rates, dtype=np.int64)
+        return ((p * (10_000 + r) + 5_000) // 10_000).tolist()
+    # no NumPy: still one comprehension instead of one Python call per row
+    return [(p * (10_000 + r) + 5_000) // 10_000 for p, r in zip(prices, rates)]
+
+
+strategies: Dict[str, Callable[[int, int], int]] = {
+    "add": add,
+    "mul": mul,
+    "sub": sub,  # no batch version: falls back to the scalar callable
+    "vat": with_vat,
+}
+
+print("strategy add:", strategies["add"](2, 3))
+dispatcher = Dispatcher(strategies)
+print(dispatcher.run([("add", 2, 3), ("mul", 2, 3), ("sub", 9, 4), ("vat", 1999, 1700), ("add", 1, 1)]))
+
+
+# Throughput: one lookup + call per operation vs grouped batches.
+# Inside the strategies the batch versions are clearly faster, but for rules as
+# cheap as add/mul/sub regrouping the tuples costs more than it saves, so the
+# plain loop wins overall. The dispatcher pays off when a batch version is
+# vectorized (NumPy) or when every scalar call has a fixed cost, like the
+# pricing service round trip further down.
+OPS = 800_000
+names = ["add", "mul", "sub", "vat"]
+operations = [(names[n % 4], n % 10_000, n % 7 * 100) for n in range(OPS)]
+
+start = perf_counter()
+one_by_one = [strategies[name](a, b) for name, a, b in operations]
+elapsed = perf_counter() - start
+print(f"one at a time: {OPS / elapsed:>12,.0f} ops/s")
+
+dispatcher = Dispatcher(strategies)
+start = perf_counter()
+batched = dispatcher.run(operations)
+elapsed = perf_counter() - start
+print(f"dispatcher:    {OPS / elapsed:>12,.0f} ops/s (same results: {batched == one_by_one})")
+for name, stats in dispatcher.stats.items():
+    print(f"  {name}: {stats.operations:,} ops in {stats.batches} batch(es), "
+          f"{stats.ops_per_sec:,.0f} ops/s inside the strategy")
+
+
+# A pricing rule served by a remote price service: every call is a round trip
+ROUND_TRIP = 0.0002
+
+
+def remote_price(sku: int, qty: int) -> int:
+    sleep(ROUND_TRIP)
+    return (sku % 500 + 100) * qty
+
+
+@batch_version(remote_price)
+def remote_price_many(skus: Sequence[int], qtys: Sequence[int]) -> List[int]:
+    sleep(ROUND_TRIP)  # one round trip for the whole group
+    return [(sku % 500 + 100) * qty for sku, qty in zip(skus, qtys)]
+
+
+pricing = {"remote": remote_price, "add": add}
+ORDERS = 2_000
+orders = [("remote" if n % 2 else "add", n, n % 5 + 1) for n in range(ORDERS)]
+
+start = perf_counter()
+one_by_one = [pricing[name](a, b) for name, a, b in orders]
+elapsed = perf_counter() - start
+print(f"remote, one at a time: {ORDERS / elapsed:>12,.0f} ops/s")
+
+dispatcher = Dispatcher(pricing)
+start = perf_counter()
+batched = dispatcher.run(orders)
+elapsed = perf_counter() - start
+print(f"remote, dispatcher:    {ORDERS / elapsed:>12,.0f} ops/s (same results: {batched == one_by_one})")
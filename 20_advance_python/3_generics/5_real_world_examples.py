@@ -1,27 +1,218 @@
 """
 Real-world style generics
 
-- Generic cache
+- Generic cache (optionally bounded with LRU eviction and per-entry TTL)
+- Get-or-compute with stampede protection and stale-while-revalidate
 - Generic result type (success/error)
 """
 
+import asyncio
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, Generic, Optional, TypeVar
+from time import monotonic, sleep
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, Set, Tuple, TypeVar
 
 
 K = TypeVar("K")
 V = TypeVar("V")
 
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+
+
+class _Flight(Generic[V]):
+    """One in-progress computation that concurrent callers can wait on."""
 
-class SimpleCache(Generic[K, V]):
     def __init__(self) -> None:
-        self._store: Dict[K, V] = {}
+        self.done = threading.Event()
+        self.value: Optional[V] = None
+        self.error: Optional[BaseException] = None
+
+
+class SimpleCache(Generic[K, V]):
+    """
+    Without arguments this is a plain unbounded dict.
+
+    max_size -> keep at most that many entries, evicting the least recently used
+    ttl      -> default seconds an entry stays valid; expired entries are dropped
+                lazily, the next time somebody asks for them
+
+    get_or_compute / aget_or_compute run the factory once per missing key, no
+    matter how many threads (or asyncio tasks) ask for it at the same time.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        if max_size is not None and max_size <= 0:
+            raise ValueError("max_size must be a positive integer")
+        self._max_size = max_size
+        self._ttl = ttl
+        # key -> (value, expires_at); OrderedDict keeps recency order, oldest first
+        self._store: "OrderedDict[K, Tuple[V, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights: Dict[K, _Flight[V]] = {}
+        self._async_flights: Dict[K, "asyncio.Task[V]"] = {}
+        self._refresh_tasks: Set["asyncio.Task[V]"] = set()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
 
-    def set(self, key: K, value: V) -> None:
-        self._store[key] = value
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        ttl = self._ttl if ttl is None else ttl
+        expires_at = monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._store[key] = (value, expires_at)
+            self._store.move_to_end(key)
+            if self._max_size is not None and len(self._store) > self._max_size:
+                self._store.popitem(last=False)
+                self._evictions += 1
 
     def get(self, key: K) -> Optional[V]:
-        return self._store.get(key)
+        with self._lock:
+            value, _ = self._lookup(key, 0.0)
+        return None if value is _MISSING else value
+
+    def _lookup(self, key: K, stale_for: float) -> Tuple[Any, bool]:
+        # Caller holds self._lock. Returns (value or _MISSING, is_stale).
+        entry = self._store.get(key)
+        if entry is None:
+            self._misses += 1
+            return _MISSING, False
+        value, expires_at = entry
+        if expires_at is not None:
+            now = monotonic()
+            if expires_at <= now:
+                if now < expires_at + stale_for:
+                    self._hits += 1
+                    return value, True
+                del self._store[key]
+                self._expirations += 1
+                self._misses += 1
+                return _MISSING, False
+        self._store.move_to_end(key)
+        self._hits += 1
+        return value, False
+
+    def get_or_compute(
+        self,
+        key: K,
+        factory: Callable[[], V],
+        ttl: Optional[float] = None,
+        stale_for: float = 0.0,
+    ) -> V:
+        """
+        Return the cached value, or run factory() once and cache its result.
+
+        stale_for -> seconds after expiry during which the old value is still
+                     served while a background thread refreshes it
+        """
+        # The lookup and joining (or starting) the key's flight happen under one
+        # lock hold: a caller preempted in between would otherwise miss the
+        # flight another thread just finished, and run the factory again.
+        with self._lock:
+            value, stale = self._lookup(key, stale_for)
+            if value is not _MISSING and not stale:
+                return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if value is not _MISSING:  # stale: serve it, and refresh if nobody else is
+            if leader:
+                threading.Thread(
+                    target=self._refresh, args=(key, flight, factory, ttl), daemon=True
+                ).start()
+            return value
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value  # type: ignore[return-value]
+        return self._fly(key, flight, factory, ttl)
+
+    def _fly(self, key: K, flight: _Flight[V], factory: Callable[[], V], ttl: Optional[float]) -> V:
+        """Run factory() for a flight this thread registered, then let its waiters go."""
+        try:
+            flight.value = factory()
+            self.set(key, flight.value, ttl)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _refresh(
+        self, key: K, flight: _Flight[V], factory: Callable[[], V], ttl: Optional[float]
+    ) -> None:
+        try:
+            self._fly(key, flight, factory, ttl)
+        except Exception:
+            pass  # keep serving the stale value; the next caller will retry
+
+    async def aget_or_compute(
+        self,
+        key: K,
+        factory: Callable[[], Awaitable[V]],
+        ttl: Optional[float] = None,
+        stale_for: float = 0.0,
+    ) -> V:
+        """Same as get_or_compute, but factory is awaited and waiters are tasks."""
+        with self._lock:
+            value, stale = self._lookup(key, stale_for)
+        if value is not _MISSING:
+            if stale and key not in self._async_flights:
+                task = asyncio.ensure_future(self._acompute_once(key, factory, ttl))
+                self._refresh_tasks.add(task)
+                task.add_done_callback(self._refresh_done)
+            return value
+        return await self._acompute_once(key, factory, ttl)
+
+    async def _acompute_once(
+        self, key: K, factory: Callable[[], Awaitable[V]], ttl: Optional[float]
+    ) -> V:
+        # The factory runs in its own task and every caller, the first one
+        # included, awaits it through shield(): a caller that is cancelled
+        # stops waiting, but the others still get the value.
+        flight = self._async_flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._afill(key, factory, ttl))
+            self._async_flights[key] = flight
+            flight.add_done_callback(lambda done: self._flight_done(key, done))
+        return await asyncio.shield(flight)
+
+    async def _afill(self, key: K, factory: Callable[[], Awaitable[V]], ttl: Optional[float]) -> V:
+        value = await factory()
+        self.set(key, value, ttl)
+        return value
+
+    def _flight_done(self, key: K, flight: "asyncio.Task[V]") -> None:
+        if self._async_flights.get(key) is flight:
+            del self._async_flights[key]
+        if not flight.cancelled():
+            flight.exception()  # mark as retrieved when every waiter was cancelled
+
+    def _refresh_done(self, task: "asyncio.Task[V]") -> None:
+        self._refresh_tasks.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, self._expirations)
+
+    def __len__(self) -> int:
+        return len(self._store)
 
 
 cache: SimpleCache[str, int] = SimpleCache()
@@ -29,6 +220,73 @@ cache.set("visits", 10)
 print(cache.get("visits"))
 
 
+orders: SimpleCache[int, str] = SimpleCache(max_size=2)
+orders.set(1, "masala")
+orders.set(2, "ginger")
+orders.get(1)               # 1 is now the most recently used
+orders.set(3, "lemon")      # evicts 2
+print(orders.get(2), orders.get(1), orders.get(3))
+
+sessions: SimpleCache[str, str] = SimpleCache(ttl=60)
+sessions.set("ali", "token-a")
+sessions.set("sara", "token-b", ttl=0)  # per-entry TTL, already expired
+print(sessions.get("ali"), sessions.get("sara"))
+
+print(orders.stats())
+print(sessions.stats())
+
+
+# Stampede protection: 8 threads miss at once, the factory still runs once
+menu_loads = 0
+
+
+def load_menu() -> str:
+    global menu_loads
+    menu_loads += 1
+    sleep(0.05)
+    return "masala, ginger, lemon"
+
+
+menus: SimpleCache[str, str] = SimpleCache(ttl=0.1)
+workers = [
+    threading.Thread(target=menus.get_or_compute, args=("menu", load_menu))
+    for _ in range(8)
+]
+for w in workers:
+    w.start()
+for w in workers:
+    w.join()
+print("menu loads after 8 concurrent misses:", menu_loads)
+
+# Stale-while-revalidate: after expiry the old value comes back immediately
+sleep(0.15)
+print(menus.get_or_compute("menu", load_menu, stale_for=5))
+sleep(0.1)
+print("menu loads after background refresh:", menu_loads)
+
+
+# The async variant does the same for tasks on one event loop
+price_fetches = 0
+
+
+async def fetch_price() -> int:
+    global price_fetches
+    price_fetches += 1
+    await asyncio.sleep(0.05)
+    return 20
+
+
+async def many_tasks() -> None:
+    prices: SimpleCache[str, int] = SimpleCache()
+    results = await asyncio.gather(
+        *(prices.aget_or_compute("masala", fetch_price) for _ in range(5))
+    )
+    print(results, "price fetches:", price_fetches)
+
+
+asyncio.run(many_tasks())
+
+
 T = TypeVar("T")
 E = TypeVar("E")
 
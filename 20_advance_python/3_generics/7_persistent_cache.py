@@ -0,0 +1,293 @@
+"""
+Persistent generic cache (warm restarts)
+
+- Hot entries live in a small in-memory LRU tier
+- Every set() is appended to a segment file; reads go through mmap
+- On restart only the key index is rebuilt (lazily, on first use);
+  values are unpickled one at a time, when they are asked for
+- Overwritten/deleted records are compacted away in a background thread
+"""
+
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import perf_counter, time
+from typing import Dict, Generic, Optional, Tuple, TypeVar
+
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+# record = header | pickled key | pickled value
+# header = key length (u32), value length (u32), expires_at (f64, 0.0 = never)
+_HEADER = struct.Struct("<IId")
+_TOMBSTONE = 0xFFFFFFFF
+
+_Entry = Tuple[int, int, float, int]
+
+
+@dataclass(frozen=True)
+class PersistentStats:
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    live_records: int
+    file_bytes: int
+    dead_bytes: int
+
+
+class PersistentCache(Generic[K, V]):
+    """
+    path        -> segment file; created if missing, reused if it already exists
+    memory_size -> how many decoded values to keep in the in-memory tier
+    ttl         -> default seconds an entry stays valid (wall clock, so it
+                   survives restarts)
+    compact_at  -> fraction of dead bytes that triggers a background compaction
+    """
+
+    def __init__(
+        self,
+        path: str,
+        memory_size: int = 1024,
+        ttl: Optional[float] = None,
+        compact_at: float = 0.5,
+    ) -> None:
+        self._path = path
+        self._memory_size = memory_size
+        self._ttl = ttl
+        self._compact_at = compact_at
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[K, Tuple[V, float]]" = OrderedDict()
+        # key -> (offset of the value bytes, value length, expires_at, record length)
+        self._index: Optional[Dict[K, _Entry]] = None
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._map: Optional[mmap.mmap] = None
+        self._size = os.fstat(self._fd).st_size
+        self._dead_bytes = 0
+        self._compactor: Optional[threading.Thread] = None
+        self._compact_lock = threading.Lock()  # one compaction at a time
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    # -- file helpers (caller holds self._lock) --------------------------
+
+    def _view(self, end: int) -> mmap.mmap:
+        # Grow the read-only mapping when the file has been appended to.
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _load_index(self) -> Dict[K, _Entry]:
+        if self._index is not None:
+            return self._index
+        index: Dict[K, _Entry] = {}
+        offset = 0
+        view = self._view(self._size) if self._size else None
+        while view is not None and offset + _HEADER.size <= self._size:
+            klen, vlen, expires_at = _HEADER.unpack_from(view, offset)
+            body = offset + _HEADER.size
+            end = body + klen + (0 if vlen == _TOMBSTONE else vlen)
+            if end > self._size:
+                break  # torn write at the tail (crash mid-append)
+            key = pickle.loads(view[body:body + klen])
+            old = index.pop(key, None)
+            if old is not None:
+                self._dead_bytes += old[3]
+            if vlen == _TOMBSTONE:
+                self._dead_bytes += end - offset
+            else:
+                index[key] = (body + klen, vlen, expires_at, end - offset)
+            offset = end
+        if offset < self._size:
+            os.truncate(self._path, offset)
+            self._size = offset
+        self._index = index
+        return index
+
+    def _append(self, key: K, payload: Optional[bytes], expires_at: float) -> _Entry:
+        kbytes = pickle.dumps(key)
+        vlen = _TOMBSTONE if payload is None else len(payload)
+        record = _HEADER.pack(len(kbytes), vlen, expires_at) + kbytes + (payload or b"")
+        offset = self._size
+        os.write(self._fd, record)
+        self._size += len(record)
+        return (offset + _HEADER.size + len(kbytes), vlen, expires_at, len(record))
+
+    def _remember(self, key: K, value: V, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self._memory_size:
+            self._memory.popitem(last=False)
+
+    # -- public API -------------------------------------------------------
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        ttl = self._ttl if ttl is None else ttl
+        expires_at = time() + ttl if ttl is not None else 0.0
+        payload = pickle.dumps(value)
+        with self._lock:
+            index = self._load_index()
+            old = index.get(key)
+            if old is not None:
+                self._dead_bytes += old[3]
+            index[key] = self._append(key, payload, expires_at)
+            self._remember(key, value, expires_at)
+        self._maybe_compact()
+
+    def get(self, key: K) -> Optional[V]:
+        now = time()
+        with self._lock:
+            hot = self._memory.get(key)
+            if hot is not None and (not hot[1] or hot[1] > now):
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return hot[0]
+            entry = self._load_index().get(key)
+            if entry is None or (entry[2] and entry[2] <= now):
+                self._misses += 1
+                return None
+            offset, vlen, expires_at, _ = entry
+            value = pickle.loads(self._view(offset + vlen)[offset:offset + vlen])
+            self._remember(key, value, expires_at)
+            self._disk_hits += 1
+            return value
+
+    def delete(self, key: K) -> None:
+        with self._lock:
+            index = self._load_index()
+            self._memory.pop(key, None)
+            old = index.pop(key, None)
+            if old is None:
+                return
+            self._dead_bytes += old[3] + self._append(key, None, 0.0)[3]
+        self._maybe_compact()
+
+    def flush(self) -> None:
+        os.fsync(self._fd)
+
+    def close(self) -> None:
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            os.close(self._fd)
+
+    def stats(self) -> PersistentStats:
+        with self._lock:
+            live = len(self._index) if self._index is not None else 0
+            return PersistentStats(
+                self._memory_hits, self._disk_hits, self._misses,
+                live, self._size, self._dead_bytes,
+            )
+
+    # -- compaction -------------------------------------------------------
+
+    def _maybe_compact(self) -> None:
+        # decided under the lock, so concurrent set()s start one compactor, not several
+        with self._lock:
+            if self._size < 64 * 1024 or self._dead_bytes < self._size * self._compact_at:
+                return
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact, daemon=True)
+            self._compactor.start()
+
+    def compact(self) -> None:
+        """
+        Rewrite only the live records into a fresh file and swap it in.
+
+        The bulk copy runs without the lock, so gets and sets keep going; records
+        appended meanwhile are copied over as a raw tail in a short final step.
+        """
+        with self._compact_lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        now = time()
+        with self._lock:
+            snapshot = dict(self._load_index())
+            snapshot_end = self._size
+            if not snapshot_end:
+                return
+            # A private mapping: set() may remap self._map while we copy
+            view = mmap.mmap(self._fd, snapshot_end, access=mmap.ACCESS_READ)
+        # a name of its own, next to the file so os.replace() stays on one filesystem
+        tmp_fd, tmp_path = tempfile.mkstemp(
+            prefix=os.path.basename(self._path) + ".", suffix=".compact",
+            dir=os.path.dirname(os.path.abspath(self._path)),
+        )
+        moved: Dict[int, int] = {}
+        try:
+            with open(tmp_fd, "wb") as out:
+                for key, (offset, vlen, expires_at, _) in snapshot.items():
+                    if expires_at and expires_at <= now:
+                        continue
+                    kbytes = pickle.dumps(key)
+                    out.write(_HEADER.pack(len(kbytes), vlen, expires_at) + kbytes)
+                    moved[offset] = out.tell()
+                    out.write(view[offset:offset + vlen])
+                with self._lock:
+                    tail_start = out.tell()
+                    out.write(self._view(self._size)[snapshot_end:self._size])
+                    out.flush()
+                    os.fsync(out.fileno())
+                    index: Dict[K, _Entry] = {}
+                    for key, (offset, vlen, expires_at, rlen) in self._index.items():  # type: ignore[union-attr]
+                        if offset >= snapshot_end:
+                            index[key] = (offset - snapshot_end + tail_start, vlen, expires_at, rlen)
+                        elif offset in moved:
+                            index[key] = (moved[offset], vlen, expires_at, rlen)
+                        else:
+                            self._memory.pop(key, None)  # expired while compacting
+                    os.replace(tmp_path, self._path)
+                    self._map.close()  # type: ignore[union-attr]
+                    self._map = None
+                    os.close(self._fd)
+                    self._fd = os.open(self._path, os.O_RDWR | os.O_APPEND)
+                    self._size = os.fstat(self._fd).st_size
+                    self._index = index
+                    # whatever is not a live record (e.g. overwrites in the copied tail)
+                    self._dead_bytes = self._size - sum(e[3] for e in index.values())
+        finally:
+            view.close()
+            if os.path.exists(tmp_path):  # only left behind when the copy failed
+                os.unlink(tmp_path)
+
+
+workdir = tempfile.TemporaryDirectory()
+path = os.path.join(workdir.name, "menu.cache")
+
+# First process: fill the cache and exit
+cache: PersistentCache[str, dict] = PersistentCache(path)
+for n in range(20_000):
+    cache.set(f"order-{n}", {"id": n, "chai": "masala", "cups": n % 5 + 1})
+cache.close()
+
+# "Restarted" process: the first hit only rebuilds the key index
+start = perf_counter()
+warm: PersistentCache[str, dict] = PersistentCache(path, compact_at=0.3)
+print(warm.get("order-42"), f"first hit after restart: {(perf_counter() - start) * 1000:.1f}ms")
+print(warm.get("order-42"), warm.get("order-999999"))
+print(warm.stats())
+
+# Overwrite most entries; the dead records are compacted in the background
+before = os.path.getsize(path)
+for n in range(15_000):
+    warm.set(f"order-{n}", {"id": n, "chai": "ginger", "cups": 1})
+warm.close()  # waits for a running compaction
+print(f"segment file: {before:,} bytes -> {os.path.getsize(path):,} bytes after 15,000 overwrites")
+
+reopened: PersistentCache[str, dict] = PersistentCache(path)
+print(reopened.get("order-7"), reopened.get("order-19999"))
+reopened.close()
+workdir.cleanup()